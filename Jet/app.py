@@ -1,10 +1,36 @@
 # Import library
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime
-import numpy as np
+from datetime import date
+import os
+import sys
+import time
+
+# Modul bersama (data_store, schema) ada di folder root project
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import data_store
+import preprocess
+import rollups
+import live
+import search
+import pagination
+import range_index
+import topk
+import calendar_grid
+import downloads
+
+if data_store.DATA_SOURCE == 'db':
+    import config  # data dan filter dibaca langsung dari PostgreSQL
+    DB_ERRORS = (config.psycopg2.Error,)
+else:
+    DB_ERRORS = ()
+
+# Mode DB: tabel order diperbarui listener LISTEN/NOTIFY (lihat live.py)
+LIVE_REFRESH = data_store.DATA_SOURCE == 'db' and live.ENABLED
+
+# Copy-on-Write: kolom turunan berbagi memori dengan tabel asal, tanpa .copy() penuh
+data_store.enable_copy_on_write()
 
 # =====================================================
 # KONFIGURASI HALAMAN
@@ -49,42 +75,109 @@ st.markdown("""
 # =====================================================
 # LOAD DATA DARI DATABASE
 # =====================================================
-@st.cache_data(ttl=300)
-def load_data():
-    """Load semua data dari CSV files"""
-    try:
-        # Load dari CSV
-        df_customers = pd.read_csv('data/customers.csv')
-        df_products = pd.read_csv('data/products.csv')
-        df_order_details = pd.read_csv('data/order_details.csv')
-        return df_customers, df_products, df_order_details
-    except FileNotFoundError:
-        st.error("⚠️ File CSV tidak ditemukan! Pastikan folder 'data' berisi file CSV.")
-        st.stop()
-
-df_customers, df_products, df_order_details = load_data()
+# Hasil cache dipakai bersama semua sesi dan hanya dihitung ulang jika file
+# data berubah (versi = hash isi file, atau change counter tabel di mode DB).
+# Hanya tabel yang versinya berubah yang dimuat ulang. Perlakukan sebagai data baca-saja.
+@st.cache_resource(max_entries=2)
+def load_customers(version, today):
+    """Data customers + kolom Age/Age_Group (dihitung ulang juga saat ganti hari)"""
+    return preprocess.load_customers('data', today)
 
-# =====================================================
-# PREPROCESSING DATA
-# =====================================================
-# Hitung usia dari birthdate
-df_customers['birthdate'] = pd.to_datetime(df_customers['birthdate'])
-df_customers['Age'] = (datetime.now() - df_customers['birthdate']).dt.days // 365
-df_customers['Age_Group'] = pd.cut(df_customers['Age'], 
-                                    bins=[0, 20, 30, 40, 50, 60, 100],
-                                    labels=['<20', '20-30', '30-40', '40-50', '50-60', '60+'])
-
-# Proses order details
-if not df_order_details.empty:
-    df_order_details['order_date'] = pd.to_datetime(df_order_details['order_date'])
-    df_order_details['quantity'] = pd.to_numeric(df_order_details['quantity'], errors='coerce').fillna(0).astype(int)
-    df_order_details['subtotal'] = pd.to_numeric(df_order_details['subtotal'], errors='coerce').fillna(0)
-    df_order_details['unit_price'] = pd.to_numeric(df_order_details['unit_price'], errors='coerce').fillna(0)
-    df_order_details['year'] = df_order_details['order_date'].dt.year
-    df_order_details['month'] = df_order_details['order_date'].dt.month
-    df_order_details['month_name'] = df_order_details['order_date'].dt.strftime('%B')
-    df_order_details['day_name'] = df_order_details['order_date'].dt.strftime('%A')
-    df_order_details['hour'] = df_order_details['order_date'].dt.hour
+@st.cache_resource(max_entries=2)
+def load_age_index(version, today):
+    """Index usia customers (posisi urut usia + histogram) untuk filter Age Range"""
+    return preprocess.build_age_index(load_customers(version, today))
+
+@st.cache_resource(max_entries=2)
+def load_products(version):
+    """Data products dengan tipe kolom yang sudah benar"""
+    return preprocess.load_products('data')
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_order_details_range(version, start_date, end_date):
+    """Tabel order + kolom waktu turunan (year, month, day_name, hour), hanya order dalam rentang tanggal filter"""
+    return preprocess.load_order_details('data', start_date=start_date, end_date=end_date)
+
+@st.cache_resource(max_entries=2)
+def load_product_search(version):
+    """Index n-gram nama produk untuk pencarian substring"""
+    df = load_products(version)
+    return search.build_index(df['name'], df['product_id'])
+
+@st.cache_resource(max_entries=2)
+def load_rollups(version):
+    """Cube penjualan harian (day, product, customer) untuk chart tren"""
+    return preprocess.load_rollups('data')
+
+@st.cache_resource
+def live_orders():
+    """Mode DB: tabel order + cube, baris baru ditambahkan listener di background"""
+    return live.start()
+
+@st.cache_resource(max_entries=2)
+def load_products_with_sales(products_version, rollups_version, _product_sales):
+    """Products + total sold/revenue (_product_sales: total per produk dari cube rollups_version)"""
+    df = load_products(products_version)
+    total_sold, total_revenue = rollups.product_sales_for(_product_sales, df['product_id'])
+    return df.assign(price=df['price'].fillna(0), total_sold=total_sold, total_revenue=total_revenue)
+
+def sales_filters(start_date, end_date, customer_name='All', product_name='All'):
+    """Mode DB: filter Sales Analytics sebagai argumen query config (WHERE berparameter)"""
+    return {
+        'start_date': start_date, 'end_date': end_date,
+        'customer_names': None if customer_name == 'All' else [customer_name],
+        'product_names': None if product_name == 'All' else [product_name],
+    }
+
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_calendar_grid(version, start_date, end_date, customer_name, product_name, _df):
+    """Grid revenue bulan x hari x jam untuk satu kombinasi filter Sales Analytics (_df = baris hasil filter)"""
+    if data_store.DATA_SOURCE == 'db':
+        # Mode DB: total per sel dihitung PostgreSQL (GROUP BY bulan, hari, jam)
+        return calendar_grid.grid_from_cells(
+            config.load_order_calendar_df(**sales_filters(start_date, end_date, customer_name, product_name)))
+    return calendar_grid.build_grid(_df)
+
+@st.cache_resource(max_entries=8)
+def load_range_index(table, column, version, _df):
+    """Index rentang (nilai urut + posisi) untuk slider filter kolom angka"""
+    return range_index.build(_df[column])
+
+# Mode DB: chart dan metrik Sales Analytics dihitung PostgreSQL (GROUP BY per
+# hari / produk / customer untuk filter sidebar), baris order tidak dimuat ke
+# dashboard. Di-cache per versi data + filter, jadi rerun tidak query ulang.
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_order_totals(group, version, start_date, end_date, customer_name='All', product_name='All'):
+    return config.load_order_totals_df(group, **sales_filters(start_date, end_date, customer_name, product_name))
+
+try:
+    versions = preprocess.data_versions('data')
+    customers_version = (versions['customers'], date.today())
+    df_customers = load_customers(*customers_version)
+    products_version = versions['products']
+    df_products = load_products(products_version)
+    # Versi tersimpan di database (sequence + statistik tabel), juga di mode live,
+    # supaya kunci cache dan file export tetap berlaku lintas proses dan restart
+    order_details_version = versions['order_details']
+    if LIVE_REFRESH:
+        # Cube live punya versinya sendiri (bisa beda dari versi database sesaat),
+        # jadi semua yang dihitung dari cube memakai rollups_version
+        live_version, live_cubes = live.snapshot(live_orders())
+        rollups_version = (order_details_version, live_version)
+    else:
+        # Dimuat di sini supaya data yang hilang/rusak ditangani blok except di bawah
+        load_rollups(order_details_version)
+        rollups_version = order_details_version
+except FileNotFoundError:
+    st.error("⚠️ File CSV tidak ditemukan! Pastikan folder 'data' berisi file CSV.")
+    st.stop()
+except DB_ERRORS as e:
+    st.error(f"⚠️ Tidak bisa membaca data dari database: {e}")
+    st.stop()
+
+def current_rollups():
+    """Cube harian untuk versi tabel order yang sedang dipakai"""
+    return live_cubes if LIVE_REFRESH else load_rollups(order_details_version)
 
 # =====================================================
 # HEADER
@@ -99,6 +192,10 @@ def show_overview():
     """Tampilan overview dengan KPI metrics"""
     st.header("📊 Business Overview")
     
+    # Semua angka order di halaman ini dari cube harian, bukan dari baris order
+    cubes = current_rollups()
+    has_orders = not cubes['orders'].empty
+    
     # KPI Metrics dalam kolom
     col1, col2, col3, col4 = st.columns(4)
     
@@ -119,8 +216,8 @@ def show_overview():
         )
     
     with col3:
-        if not df_order_details.empty:
-            total_revenue = df_order_details['subtotal'].sum()
+        if has_orders:
+            total_revenue = cubes['product_sales']['revenue'].sum()
             st.metric(
                 label="💰 Total Revenue",
                 value=f"Rp {total_revenue:,.0f}",
@@ -130,8 +227,9 @@ def show_overview():
             st.metric(label="💰 Total Revenue", value="Rp 0")
     
     with col4:
-        if not df_order_details.empty:
-            total_orders = df_order_details['order_id'].nunique()
+        if has_orders:
+            # Satu order hanya punya satu tanggal dan customer, jadi jumlah order per hari bisa dijumlahkan
+            total_orders = int(cubes['orders']['orders'].sum())
             st.metric(
                 label="🛒 Total Orders",
                 value=f"{total_orders:,}",
@@ -147,9 +245,8 @@ def show_overview():
     
     with col_left:
         st.subheader("📈 Revenue Trend Over Time")
-        if not df_order_details.empty:
-            daily_revenue = df_order_details.groupby(df_order_details['order_date'].dt.date)['subtotal'].sum().reset_index()
-            daily_revenue.columns = ['Date', 'Revenue']
+        if has_orders:
+            daily_revenue = rollups.roll_up(cubes, 'D')[['Date', 'Revenue']]
             
             fig = px.area(daily_revenue, x='Date', y='Revenue', 
                          title='Daily Revenue',
@@ -163,7 +260,7 @@ def show_overview():
     with col_right:
         st.subheader("👥 Customer Age Distribution")
         if not df_customers.empty:
-            age_dist = df_customers['Age_Group'].value_counts().sort_index()
+            age_dist = load_age_index(*customers_version)['group_counts']
             
             fig = px.pie(values=age_dist.values, names=age_dist.index,
                         title='Customer by Age Group',
@@ -178,8 +275,8 @@ def show_overview():
     
     with col_left2:
         st.subheader("🔥 Top 10 Best Selling Products")
-        if not df_order_details.empty:
-            top_products = df_order_details.groupby('product_name')['quantity'].sum().sort_values(ascending=False).head(10)
+        if has_orders:
+            top_products = rollups.with_names(rollups.top_products(cubes['product_sales'], 10), cubes['products'])
             
             fig = px.bar(x=top_products.values, y=top_products.index, 
                         orientation='h',
@@ -193,9 +290,10 @@ def show_overview():
     
     with col_right2:
         st.subheader("📅 Orders by Day of Week")
-        if not df_order_details.empty:
+        if has_orders:
             day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            orders_by_day = df_order_details.groupby('day_name')['order_id'].nunique().reindex(day_order, fill_value=0)
+            daily_orders = cubes['orders']
+            orders_by_day = daily_orders.groupby(daily_orders['date'].dt.day_name())['orders'].sum().reindex(day_order, fill_value=0)
             
             fig = px.bar(x=orders_by_day.index, y=orders_by_day.values,
                         labels={'x': 'Day', 'y': 'Number of Orders'},
@@ -218,15 +316,16 @@ def show_customers():
         st.subheader("🔍 Customer Filters")
         
         # Age filter
-        age_min = int(df_customers['Age'].min())
-        age_max = int(df_customers['Age'].max())
+        age_index = load_age_index(*customers_version)
+        age_min = age_index['min_age']
+        age_max = age_index['max_age']
         age_range = st.slider("Age Range", age_min, age_max, (age_min, age_max))
         
         # Search by name
         search_name = st.text_input("Search by Name", "")
     
     # Apply filters
-    filtered_customers = df_customers[df_customers['Age'].between(*age_range)]
+    filtered_customers = preprocess.filter_age(df_customers, age_index, *age_range)
     if search_name:
         filtered_customers = filtered_customers[filtered_customers['name'].str.contains(search_name, case=False, na=False)]
     
@@ -237,9 +336,10 @@ def show_customers():
     with col2:
         avg_age = filtered_customers['Age'].mean()
         st.metric("Average Age", f"{avg_age:.1f} years")
+    cubes = current_rollups()
     with col3:
-        if not df_order_details.empty:
-            customers_with_orders = df_order_details['customer_id'].nunique()
+        if not cubes['orders'].empty:
+            customers_with_orders = len(cubes['customer_totals'])
             st.metric("Active Buyers", f"{customers_with_orders:,}")
         else:
             st.metric("Active Buyers", "0")
@@ -251,9 +351,16 @@ def show_customers():
     
     with col_v1:
         st.subheader("📊 Age Distribution")
-        fig = px.histogram(filtered_customers, x='Age', nbins=20,
-                          labels={'Age': 'Age (years)', 'count': 'Number of Customers'},
-                          color_discrete_sequence=['#42A5F5'])
+        if search_name:
+            fig = px.histogram(filtered_customers, x='Age', nbins=20,
+                              labels={'Age': 'Age (years)', 'count': 'Number of Customers'},
+                              color_discrete_sequence=['#42A5F5'])
+        else:
+            # Tanpa pencarian nama: pakai histogram usia yang sudah dihitung di index
+            age_counts = preprocess.age_histogram(age_index).loc[age_range[0]:age_range[1]]
+            fig = px.histogram(x=age_counts.index, y=age_counts.values, histfunc='sum', nbins=20,
+                              labels={'x': 'Age (years)', 'y': 'Number of Customers'},
+                              color_discrete_sequence=['#42A5F5'])
         fig.update_layout(height=350)
         st.plotly_chart(fig, use_container_width=True)
     
@@ -272,12 +379,14 @@ def show_customers():
         st.plotly_chart(fig, use_container_width=True)
     
     # Customer spending analysis
-    if not df_order_details.empty:
+    if not cubes['orders'].empty:
         st.subheader("💳 Top 10 Customers by Spending")
-        customer_spending = df_order_details.groupby(['customer_id', 'customer_name'])['subtotal'].sum().sort_values(ascending=False).head(10)
+        # Total per customer_id dari rollup (bukan per baris order), nama hanya untuk 10 teratas
+        totals = cubes['customer_totals']['revenue']
+        customer_spending = rollups.with_names(topk.top_series(totals, 10), cubes['customers'])
         
         fig = go.Figure(data=[
-            go.Bar(x=customer_spending.values, y=[name for _, name in customer_spending.index],
+            go.Bar(x=customer_spending.values, y=customer_spending.index,
                   orientation='h',
                   marker=dict(color=customer_spending.values,
                             colorscale='Plasma',
@@ -312,15 +421,13 @@ def show_customers():
             ascending=(sort_order == "Ascending")
         )
         
-        st.dataframe(display_df, use_container_width=True, height=400)
+        pagination.paged_table(display_df, key="customers", lang="en", height=400)
         
         # Download button
-        csv = display_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download Customer Data (CSV)",
-            data=csv,
-            file_name='customers_data.csv',
-            mime='text/csv'
+        downloads.download_widget(
+            display_df, "📥 Download Customer Data", 'customers_data', key="customers",
+            cache_key=('customers', customers_version, age_range, search_name, sort_col, sort_order,
+                       tuple(selected_cols)), lang="en"
         )
 
 # =====================================================
@@ -330,41 +437,17 @@ def show_products():
     """Analisis produk dengan visualisasi interaktif"""
     st.header("📦 Product Analytics")
     
-    # Konversi tipe data produk
-    df_products_work = df_products.copy()
-    df_products_work['price'] = pd.to_numeric(df_products_work['price'], errors='coerce').fillna(0)
-    df_products_work['stock'] = pd.to_numeric(df_products_work['stock'], errors='coerce').fillna(0).astype(int)
-    
-    # Calculate sales data
-    if not df_order_details.empty:
-        product_sales = df_order_details.groupby(['product_id', 'product_name']).agg({
-            'quantity': 'sum',
-            'subtotal': 'sum'
-        }).reset_index()
-        product_sales.columns = ['product_id', 'product_name', 'total_sold', 'total_revenue']
-        
-        # Konversi tipe data
-        product_sales['total_sold'] = pd.to_numeric(product_sales['total_sold'], errors='coerce').fillna(0).astype(int)
-        product_sales['total_revenue'] = pd.to_numeric(product_sales['total_revenue'], errors='coerce').fillna(0)
-        
-        df_products_enhanced = df_products_work.merge(product_sales, 
-                                                  left_on=['product_id', 'name'], 
-                                                  right_on=['product_id', 'product_name'],
-                                                  how='left')
-        df_products_enhanced['total_sold'] = pd.to_numeric(df_products_enhanced['total_sold'], errors='coerce').fillna(0).astype(int)
-        df_products_enhanced['total_revenue'] = pd.to_numeric(df_products_enhanced['total_revenue'], errors='coerce').fillna(0).astype(float)
-    else:
-        df_products_enhanced = df_products_work.copy()
-        df_products_enhanced['total_sold'] = 0
-        df_products_enhanced['total_revenue'] = 0.0
+    # Total per produk diambil dari rollup (ditambah baris baru saja saat data berubah)
+    df_products_enhanced = load_products_with_sales(
+        products_version, rollups_version, current_rollups()['product_sales'])
     
     # Sidebar filters
     with st.sidebar:
         st.subheader("🔍 Product Filters")
         
-        # Price range
-        price_min = float(df_products_enhanced['price'].min())
-        price_max = float(df_products_enhanced['price'].max())
+        # Price range (harga sudah diisi 0, jadi index selalu punya nilai selama ada produk)
+        price_index = load_range_index('products', 'price', products_version, df_products_enhanced)
+        price_min, price_max = range_index.value_range(price_index)
         price_range = st.slider("Price Range (Rp)", price_min, price_max, (price_min, price_max))
         
         # Stock range
@@ -376,12 +459,11 @@ def show_products():
         search_product = st.text_input("Search Product", "")
     
     # Apply filters
-    filtered_products = df_products_enhanced[
-        (df_products_enhanced['price'].between(*price_range)) &
-        (df_products_enhanced['stock'].between(*stock_range))
-    ]
+    filtered_products = range_index.filter_range(df_products_enhanced, price_index, *price_range)
+    filtered_products = filtered_products[filtered_products['stock'].between(*stock_range)]
     if search_product:
-        filtered_products = filtered_products[filtered_products['name'].str.contains(search_product, case=False, na=False)]
+        matches = search.search_ids(load_product_search(products_version), search_product)
+        filtered_products = filtered_products[filtered_products['product_id'].isin(matches)]
     
     # Metrics
     col1, col2, col3, col4 = st.columns(4)
@@ -497,14 +579,12 @@ def show_products():
             ascending=(sort_order == "Ascending")
         )
         
-        st.dataframe(display_df, use_container_width=True, height=400)
+        pagination.paged_table(display_df, key="products", lang="en", height=400)
         
-        csv = display_df.to_csv(index=False).encode('utf-8')
-        st.download_button(
-            label="📥 Download Product Data (CSV)",
-            data=csv,
-            file_name='products_data.csv',
-            mime='text/csv'
+        downloads.download_widget(
+            display_df, "📥 Download Product Data", 'products_data', key="products",
+            cache_key=('products', products_version, rollups_version, price_range, stock_range,
+                       search_product, sort_col, sort_order, tuple(selected_cols)), lang="en"
         )
 
 # =====================================================
@@ -514,7 +594,8 @@ def show_sales():
     """Analisis penjualan dengan visualisasi mendalam"""
     st.header("💰 Sales Analytics")
     
-    if df_order_details.empty:
+    dims = current_rollups()
+    if dims['orders'].empty:
         st.warning("No sales data available")
         return
     
@@ -523,8 +604,8 @@ def show_sales():
         st.subheader("🔍 Sales Filters")
         
         # Date range
-        min_date = df_order_details['order_date'].min().date()
-        max_date = df_order_details['order_date'].max().date()
+        min_date = dims['orders']['date'].min().date()
+        max_date = dims['orders']['date'].max().date()
         date_range = st.date_input(
             "Date Range",
             value=(min_date, max_date),
@@ -533,42 +614,51 @@ def show_sales():
         )
         
         # Customer filter
-        all_customers = ['All'] + sorted(df_order_details['customer_name'].unique().tolist())
+        all_customers = ['All'] + sorted(dims['customers'].unique().tolist())
         selected_customer = st.selectbox("Customer", all_customers)
         
         # Product filter
-        all_products = ['All'] + sorted(df_order_details['product_name'].unique().tolist())
+        all_products = ['All'] + sorted(dims['products'].unique().tolist())
         selected_product = st.selectbox("Product", all_products)
     
     # Apply filters
-    filtered_sales = df_order_details[
-        (df_order_details['order_date'].dt.date >= date_range[0]) &
-        (df_order_details['order_date'].dt.date <= date_range[1])
-    ]
-    
-    if selected_customer != 'All':
-        filtered_sales = filtered_sales[filtered_sales['customer_name'] == selected_customer]
-    
-    if selected_product != 'All':
-        filtered_sales = filtered_sales[filtered_sales['product_name'] == selected_product]
+    filter_args = (order_details_version, date_range[0], date_range[1], selected_customer, selected_product)
+    if data_store.DATA_SOURCE == 'db':
+        # Filter dan agregasi dijalankan PostgreSQL (WHERE + GROUP BY), baris order tidak dimuat
+        filtered_sales = None
+        daily_totals = load_order_totals('date', *filter_args)
+        total_orders = int(daily_totals['orders'].sum())  # satu order hanya punya satu tanggal
+        total_items = daily_totals['quantity'].sum()
+        total_revenue = daily_totals['revenue'].sum()
+        avg_order_value = total_revenue / total_orders if total_orders else float('nan')
+    else:
+        # Hanya order dalam rentang tanggal yang dibaca dari folder data
+        filtered_sales = load_order_details_range(order_details_version, date_range[0], date_range[1])
+
+        if selected_customer != 'All':
+            filtered_sales = filtered_sales[filtered_sales['customer_name'] == selected_customer]
+
+        if selected_product != 'All':
+            filtered_sales = filtered_sales[filtered_sales['product_name'] == selected_product]
+
+        total_orders = filtered_sales['order_id'].nunique()
+        total_items = filtered_sales['quantity'].sum()
+        total_revenue = filtered_sales['subtotal'].sum()
+        avg_order_value = filtered_sales.groupby('order_id')['subtotal'].sum().mean()
     
     # Key Metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_orders = filtered_sales['order_id'].nunique()
         st.metric("🛒 Total Orders", f"{total_orders:,}")
     
     with col2:
-        total_items = filtered_sales['quantity'].sum()
         st.metric("📦 Items Sold", f"{int(total_items):,}")
     
     with col3:
-        total_revenue = filtered_sales['subtotal'].sum()
         st.metric("💰 Total Revenue", f"Rp {total_revenue:,.0f}")
     
     with col4:
-        avg_order_value = filtered_sales.groupby('order_id')['subtotal'].sum().mean()
         st.metric("📊 Avg Order Value", f"Rp {avg_order_value:,.0f}")
     
     st.markdown("---")
@@ -582,24 +672,17 @@ def show_sales():
         # Pilihan granularity
         granularity = st.radio("Select Granularity", ["Daily", "Weekly", "Monthly"], horizontal=True)
         
-        if granularity == "Daily":
-            time_series = filtered_sales.groupby(filtered_sales['order_date'].dt.date).agg({
-                'subtotal': 'sum',
-                'order_id': 'nunique'
-            }).reset_index()
-            time_series.columns = ['Date', 'Revenue', 'Orders']
-        elif granularity == "Weekly":
-            time_series = filtered_sales.groupby(filtered_sales['order_date'].dt.to_period('W').dt.start_time).agg({
-                'subtotal': 'sum',
-                'order_id': 'nunique'
-            }).reset_index()
-            time_series.columns = ['Date', 'Revenue', 'Orders']
-        else:  # Monthly
-            time_series = filtered_sales.groupby(filtered_sales['order_date'].dt.to_period('M').dt.start_time).agg({
-                'subtotal': 'sum',
-                'order_id': 'nunique'
-            }).reset_index()
-            time_series.columns = ['Date', 'Revenue', 'Orders']
+        # Dihitung dari cube harian, di-rollup ke minggu/bulan
+        freq = {"Daily": 'D', "Weekly": 'W', "Monthly": 'M'}[granularity]
+        if data_store.DATA_SOURCE == 'db':
+            # Total harian yang sudah difilter PostgreSQL
+            time_series = rollups.period_totals(daily_totals, freq)[['Date', 'Revenue', 'Orders']]
+        else:
+            time_series = rollups.roll_up(
+                dims, freq, date_range[0], date_range[1],
+                product_ids=None if selected_product == 'All' else rollups.product_ids_by_name(dims, [selected_product]),
+                customer_ids=None if selected_customer == 'All' else rollups.customer_ids_by_name(dims, [selected_customer]),
+            )[['Date', 'Revenue', 'Orders']]
         
         # Dual axis chart
         fig = go.Figure()
@@ -629,11 +712,23 @@ def show_sales():
         st.plotly_chart(fig, use_container_width=True)
     
     with tab2:
+        # Dikelompokkan per id (bincount, atau GROUP BY di mode DB), nama dari tabel dimensi hanya untuk 10 teratas
+        if data_store.DATA_SOURCE == 'db':
+            product_totals = load_order_totals('product', *filter_args).set_index('product_id')
+            customer_totals = load_order_totals('customer', *filter_args).set_index('customer_id')
+            product_revenue = product_totals['revenue']
+            product_quantity = product_totals['quantity']
+            customer_revenue = customer_totals['revenue']
+        else:
+            product_revenue = rollups.totals_by_key(filtered_sales, 'product_id', 'subtotal')
+            product_quantity = rollups.totals_by_key(filtered_sales, 'product_id', 'quantity')
+            customer_revenue = rollups.totals_by_key(filtered_sales, 'customer_id', 'subtotal')
+        top_products_revenue = rollups.with_names(topk.top_series(product_revenue, 10), dims['products'])
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("🥇 Top 10 Products by Revenue")
-            top_products_revenue = filtered_sales.groupby('product_name')['subtotal'].sum().sort_values(ascending=False).head(10)
             
             fig = px.bar(x=top_products_revenue.values, y=top_products_revenue.index,
                         orientation='h',
@@ -645,7 +740,7 @@ def show_sales():
         
         with col2:
             st.subheader("🥇 Top 10 Customers by Spending")
-            top_customers = filtered_sales.groupby('customer_name')['subtotal'].sum().sort_values(ascending=False).head(10)
+            top_customers = rollups.with_names(topk.top_series(customer_revenue, 10), dims['customers'])
             
             fig = px.bar(x=top_customers.values, y=top_customers.index,
                         orientation='h',
@@ -659,7 +754,7 @@ def show_sales():
         
         with col3:
             st.subheader("🔥 Most Popular Products (by Quantity)")
-            top_quantity = filtered_sales.groupby('product_name')['quantity'].sum().sort_values(ascending=False).head(10)
+            top_quantity = rollups.with_names(topk.top_series(product_quantity, 10), dims['products'])
             
             fig = px.pie(values=top_quantity.values, names=top_quantity.index,
                         color_discrete_sequence=px.colors.sequential.RdBu)
@@ -668,7 +763,7 @@ def show_sales():
         
         with col4:
             st.subheader("💎 Revenue Distribution by Product")
-            revenue_by_product = filtered_sales.groupby('product_name')['subtotal'].sum().sort_values(ascending=False).head(10)
+            revenue_by_product = top_products_revenue
             
             fig = px.pie(values=revenue_by_product.values, names=revenue_by_product.index,
                         color_discrete_sequence=px.colors.sequential.Plasma)
@@ -676,12 +771,14 @@ def show_sales():
             st.plotly_chart(fig, use_container_width=True)
     
     with tab3:
+        # Satu grid bulan x hari x jam per kombinasi filter, semua chart di tab ini diambil dari situ
+        grid = load_calendar_grid(*filter_args, filtered_sales)
+        
         col1, col2 = st.columns(2)
         
         with col1:
             st.subheader("📅 Sales by Day of Week")
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            sales_by_day = filtered_sales.groupby('day_name')['subtotal'].sum().reindex(day_order, fill_value=0)
+            sales_by_day = calendar_grid.by_day(grid)
             
             fig = px.bar(x=sales_by_day.index, y=sales_by_day.values,
                         labels={'x': 'Day', 'y': 'Revenue (Rp)'},
@@ -692,7 +789,7 @@ def show_sales():
         
         with col2:
             st.subheader("⏰ Sales by Hour of Day")
-            sales_by_hour = filtered_sales.groupby('hour')['subtotal'].sum()
+            sales_by_hour = calendar_grid.by_hour(grid)
             
             fig = px.line(x=sales_by_hour.index, y=sales_by_hour.values,
                          markers=True,
@@ -702,16 +799,8 @@ def show_sales():
             st.plotly_chart(fig, use_container_width=True)
         
         st.subheader("🗓️ Sales Heatmap by Month and Day")
-        if len(filtered_sales) > 0:
-            heatmap_data = filtered_sales.groupby(['month_name', 'day_name'])['subtotal'].sum().reset_index()
-            heatmap_pivot = heatmap_data.pivot(index='day_name', columns='month_name', values='subtotal').fillna(0)
-            
-            # Reorder
-            month_order = ['January', 'February', 'March', 'April', 'May', 'June', 
-                          'July', 'August', 'September', 'October', 'November', 'December']
-            day_order = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-            
-            heatmap_pivot = heatmap_pivot.reindex(index=day_order, columns=[m for m in month_order if m in heatmap_pivot.columns], fill_value=0)
+        if grid['lines'].any():
+            heatmap_pivot = calendar_grid.month_day(grid)
             
             fig = px.imshow(heatmap_pivot,
                            labels=dict(x="Month", y="Day", color="Revenue (Rp)"),
@@ -719,11 +808,22 @@ def show_sales():
                            aspect="auto")
             fig.update_layout(height=400)
             st.plotly_chart(fig, use_container_width=True)
+            
+            st.subheader("🕒 Sales Heatmap by Day and Hour")
+            fig = px.imshow(calendar_grid.day_hour(grid),
+                           labels=dict(x="Hour of Day", y="Day", color="Revenue (Rp)"),
+                           color_continuous_scale='YlOrRd',
+                           aspect="auto")
+            fig.update_layout(height=400)
+            st.plotly_chart(fig, use_container_width=True)
     
     with tab4:
         st.subheader("📊 Detailed Sales Data")
         
-        available_cols = filtered_sales.columns.tolist()
+        if data_store.DATA_SOURCE == 'db':
+            available_cols = list(config.ORDER_DETAILS_EXPORT_COLUMNS)
+        else:
+            available_cols = filtered_sales.columns.tolist()
         default_cols = ['order_date', 'customer_name', 'product_name', 'quantity', 'unit_price', 'subtotal']
         selected_cols = st.multiselect(
             "Select Columns",
@@ -732,23 +832,32 @@ def show_sales():
         )
         
         if selected_cols:
-            sort_col = st.selectbox("Sort by", selected_cols,
-                                   index=selected_cols.index('order_date') if 'order_date' in selected_cols else 0)
+            # Mode DB: hanya kolom yang bisa diurutkan di SQL (keyset pagination)
+            sort_cols = selected_cols
+            if data_store.DATA_SOURCE == 'db':
+                sort_cols = [col for col in selected_cols if col in config.ORDER_DETAILS_SORT_COLUMNS] or ['order_date']
+            sort_col = st.selectbox("Sort by", sort_cols,
+                                   index=sort_cols.index('order_date') if 'order_date' in sort_cols else 0)
             sort_order = st.radio("Order", ["Ascending", "Descending"], horizontal=True, key='sales_sort')
             
-            display_df = filtered_sales[selected_cols].sort_values(
-                by=sort_col,
-                ascending=(sort_order == "Ascending")
-            )
-            
-            st.dataframe(display_df, use_container_width=True, height=400)
+            if data_store.DATA_SOURCE == 'db':
+                # Halaman tabel dan file download diurutkan PostgreSQL, bukan di memori
+                filters = sales_filters(*filter_args[1:])
+                pagination.keyset_table(filters, sort_col, sort_order == "Ascending", selected_cols,
+                                        key="sales", lang="en", height=400)
+                display_df = downloads.order_details_source(filters, sort_col, sort_order == "Ascending",
+                                                            selected_cols, int(daily_totals['lines'].sum()))
+            else:
+                display_df = filtered_sales[selected_cols].sort_values(
+                    by=sort_col,
+                    ascending=(sort_order == "Ascending")
+                )
+                pagination.paged_table(display_df, key="sales", lang="en", height=400)
             
-            csv = display_df.to_csv(index=False).encode('utf-8')
-            st.download_button(
-                label="📥 Download Sales Data (CSV)",
-                data=csv,
-                file_name='sales_data.csv',
-                mime='text/csv'
+            downloads.download_widget(
+                display_df, "📥 Download Sales Data", 'sales_data', key="sales",
+                cache_key=('order_details', order_details_version, tuple(date_range), selected_customer,
+                           selected_product, sort_col, sort_order, tuple(selected_cols)), lang="en"
             )
 
 # =====================================================
@@ -775,3 +884,8 @@ elif page == "📦 Products":
     show_products()
 elif page == "💰 Sales Analytics":
     show_sales()
+
+# Ada export background yang belum selesai: render ulang sebentar lagi untuk update progres
+if st.session_state.pop('export_running', False):
+    time.sleep(1)
+    st.rerun()
@@ -32,6 +32,10 @@ CREATE TABLE IF NOT EXISTS products (
 CREATE INDEX idx_products_name ON products (name);
 -- Untuk analisis harga produk (misal histogram harga)
 CREATE INDEX idx_products_price ON products (price);
+-- Untuk kotak "Cari Nama Produk" (name ILIKE '%kata%'): index btree di atas tidak bisa
+-- dipakai untuk pola yang diawali %, index trigram (pg_trgm) bisa
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX idx_products_name_trgm ON products USING GIN (name gin_trgm_ops);
 
 -- Tabel orders
 CREATE TABLE IF NOT EXISTS orders (
@@ -143,3 +147,122 @@ SELECT
     (random() * 4 + 1)::int AS quantity,          -- 1–5 pcs
     (random() * 90000 + 10000)::numeric(10,2)     -- harga 10k–100k
 FROM generate_series(1, 100);
+
+-- =====================================================
+-- Materialized view untuk agregasi dashboard
+-- =====================================================
+-- Agregasi berat dihitung sekali di database, dashboard cukup membaca hasilnya.
+-- Di-refresh berkala dengan REFRESH MATERIALIZED VIEW CONCURRENTLY (lihat refresh_views.py),
+-- jadi dashboard tetap bisa membaca selama refresh. CONCURRENTLY butuh UNIQUE INDEX di setiap view.
+
+-- Pendapatan harian (area chart / tren harian)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_daily_revenue AS
+SELECT
+    o.order_date::date AS order_day,
+    SUM(od.subtotal) AS revenue,
+    SUM(od.quantity) AS items,
+    COUNT(DISTINCT o.order_id) AS orders,
+    COUNT(*) AS lines
+FROM order_details od
+JOIN orders o ON od.order_id = o.order_id
+GROUP BY o.order_date::date;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_daily_revenue_day ON mv_daily_revenue (order_day);
+
+-- Ringkasan penjualan per produk (total terjual & pendapatan, produk tanpa penjualan = 0)
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_product_sales AS
+SELECT
+    p.product_id,
+    p.name,
+    p.price,
+    p.stock,
+    COALESCE(SUM(od.quantity), 0) AS total_terjual,
+    COALESCE(SUM(od.subtotal), 0) AS total_pendapatan
+FROM products p
+LEFT JOIN order_details od ON od.product_id = p.product_id
+GROUP BY p.product_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_product_sales_id ON mv_product_sales (product_id);
+
+-- Total belanja per pelanggan
+CREATE MATERIALIZED VIEW IF NOT EXISTS mv_customer_spending AS
+SELECT
+    c.customer_id,
+    c.name,
+    COUNT(DISTINCT o.order_id) AS orders,
+    COALESCE(SUM(od.quantity), 0) AS items,
+    COALESCE(SUM(od.subtotal), 0) AS total_spending,
+    MAX(o.order_date) AS last_order_date
+FROM customers c
+LEFT JOIN orders o ON o.customer_id = c.customer_id
+LEFT JOIN order_details od ON od.order_id = o.order_id
+GROUP BY c.customer_id;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_mv_customer_spending_id ON mv_customer_spending (customer_id);
+
+-- =====================================================
+-- Versi data (change counter) untuk cache dashboard
+-- =====================================================
+-- Setiap statement INSERT/UPDATE/DELETE/TRUNCATE menaikkan versi tabelnya.
+-- Versi disimpan di satu SEQUENCE per tabel: nextval tidak mengunci baris apa
+-- pun, jadi transaksi yang menulis bersamaan tidak saling menunggu di satu
+-- baris counter. Dashboard membaca nilai terakhirnya setiap rerun dan hanya
+-- memuat ulang tabel yang versinya berubah (lihat table_versions() di config.py).
+CREATE SEQUENCE IF NOT EXISTS data_version_customers;
+CREATE SEQUENCE IF NOT EXISTS data_version_products;
+CREATE SEQUENCE IF NOT EXISTS data_version_orders;
+CREATE SEQUENCE IF NOT EXISTS data_version_order_details;
+
+CREATE OR REPLACE FUNCTION bump_data_version() RETURNS trigger AS $$
+BEGIN
+    PERFORM nextval('data_version_' || TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- FOR EACH STATEMENT: satu kenaikan per statement, bukan per baris
+CREATE TRIGGER trg_customers_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customers
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER trg_products_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER trg_orders_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON orders
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+CREATE TRIGGER trg_order_details_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON order_details
+FOR EACH STATEMENT EXECUTE FUNCTION bump_data_version();
+
+-- =====================================================
+-- Notifikasi perubahan data (LISTEN/NOTIFY) untuk live refresh dashboard
+-- =====================================================
+-- Payload: '<tabel>:<operasi>', misal 'order_details:INSERT'. Dashboard mode DB
+-- mendengarkan channel dashboard_changes dan hanya mengambil baris baru
+-- (lihat live.py). NOTIFY dikirim saat transaksi commit, payload kembar
+-- dalam satu transaksi digabung oleh PostgreSQL.
+CREATE OR REPLACE FUNCTION notify_dashboard_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('dashboard_changes', TG_TABLE_NAME || ':' || TG_OP);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER trg_customers_notify
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON customers
+FOR EACH STATEMENT EXECUTE FUNCTION notify_dashboard_change();
+
+CREATE TRIGGER trg_products_notify
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON products
+FOR EACH STATEMENT EXECUTE FUNCTION notify_dashboard_change();
+
+CREATE TRIGGER trg_orders_notify
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON orders
+FOR EACH STATEMENT EXECUTE FUNCTION notify_dashboard_change();
+
+CREATE TRIGGER trg_order_details_notify
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON order_details
+FOR EACH STATEMENT EXECUTE FUNCTION notify_dashboard_change();
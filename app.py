@@ -1,10 +1,34 @@
 # Import library
 import streamlit as st
 import pandas as pd
-from datetime import datetime
+from datetime import date
 import plotly.express as px
-import plotly.graph_objects as go
-import os
+import json
+import time
+
+import data_store
+import preprocess
+import rollups
+import live
+import search
+import pagination
+import sort_index
+import range_index
+import topk
+import downloads
+import chart_cache
+
+if data_store.DATA_SOURCE == 'db':
+    import config  # data dan filter dibaca langsung dari PostgreSQL
+    DB_ERRORS = (config.psycopg2.Error,)
+else:
+    DB_ERRORS = ()
+
+# Mode DB: tabel order diperbarui listener LISTEN/NOTIFY (lihat live.py)
+LIVE_REFRESH = data_store.DATA_SOURCE == 'db' and live.ENABLED
+
+# Copy-on-Write: kolom turunan berbagi memori dengan tabel asal, tanpa .copy() penuh
+data_store.enable_copy_on_write()
 
 # =====================================================
 # KONFIGURASI HALAMAN
@@ -12,30 +36,101 @@ import os
 st.set_page_config("Dashboard Sales", page_icon="📊", layout="wide")
 
 # =====================================================
-# LOAD DATA DARI CSV
+# LOAD + PREPROCESSING DATA (sekali per versi data)
 # =====================================================
-@st.cache_data
-def load_data():
-    """Load data dari CSV files"""
-    try:
-        # Coba load dari folder data
-        df_customers = pd.read_csv('data/customers.csv')
-        df_products = pd.read_csv('data/products.csv')
-        df_order_details = pd.read_csv('data/order_details.csv')
-        return df_customers, df_products, df_order_details
-    except FileNotFoundError:
-        st.error("⚠️ File CSV tidak ditemukan! Pastikan folder 'data' berisi file CSV.")
-        st.stop()
+# Hasil cache dipakai bersama semua sesi dan hanya dihitung ulang jika file
+# data berubah (versi = hash isi file, atau change counter tabel di mode DB).
+# Hanya tabel yang versinya berubah yang dimuat ulang. Perlakukan sebagai data baca-saja.
+@st.cache_resource(max_entries=2)
+def load_customers(version, today):
+    """Data pelanggan + kolom Age/Age_Group (dihitung ulang juga saat ganti hari)"""
+    return preprocess.load_customers('data', today)
+
+@st.cache_resource(max_entries=2)
+def load_age_index(version, today):
+    """Index usia pelanggan (posisi urut usia + histogram) untuk filter rentang usia"""
+    return preprocess.build_age_index(load_customers(version, today))
+
+@st.cache_resource(max_entries=2)
+def load_products(version):
+    """Data produk dengan tipe kolom yang sudah benar"""
+    return preprocess.load_products('data')
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_order_details_range(version, start_date, end_date):
+    """Tabel order + kolom waktu turunan, hanya order dalam rentang tanggal filter"""
+    return preprocess.load_order_details('data', start_date=start_date, end_date=end_date)
+
+@st.cache_resource(max_entries=2)
+def load_product_search(version):
+    """Index n-gram nama produk untuk pencarian substring"""
+    df = load_products(version)
+    return search.build_index(df['name'], df['product_id'])
+
+@st.cache_resource(max_entries=2)
+def load_rollups(version):
+    """Cube penjualan harian (day, product, customer) untuk chart tren"""
+    return preprocess.load_rollups('data')
+
+@st.cache_resource
+def live_orders():
+    """Mode DB: tabel order + cube, baris baru ditambahkan listener di background"""
+    return live.start()
+
+@st.cache_resource(max_entries=2)
+def load_products_with_sales(products_version, rollups_version, _product_sales):
+    """Produk + total terjual/pendapatan (_product_sales: total per produk dari cube rollups_version)"""
+    df_prod = load_products(products_version)
+    total_terjual, total_pendapatan = rollups.product_sales_for(_product_sales, df_prod['product_id'])
+    return df_prod.assign(total_terjual=total_terjual, total_pendapatan=total_pendapatan)
+
+@st.cache_resource(max_entries=8)
+def load_sort_index(table, version, _df):
+    """Cache urutan per kolom untuk tabel dasar (_df tidak di-hash, cukup table + version)"""
+    return sort_index.new_sort_index(_df)
+
+@st.cache_resource(max_entries=8)
+def load_range_index(table, column, version, _df):
+    """Index rentang (nilai urut + posisi) untuk slider filter kolom angka"""
+    return range_index.build(_df[column])
+
+# Mode DB: chart dan metrik halaman order dihitung PostgreSQL (GROUP BY per
+# hari / produk untuk filter sidebar), baris order tidak dimuat ke dashboard.
+# Di-cache per versi data + filter, jadi rerun tidak query ulang.
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_order_totals(group, version, start_date, end_date, product_search=''):
+    return config.load_order_totals_df(
+        group, start_date=start_date, end_date=end_date, product_search=product_search)
 
 # Load data
-df_customers, df_products, df_order_details = load_data()
-
-# =====================================================
-# PREPROCESSING DATA
-# =====================================================
-# Hitung usia dari birthdate
-df_customers['birthdate'] = pd.to_datetime(df_customers['birthdate'])
-df_customers['Age'] = (datetime.now() - df_customers['birthdate']).dt.days // 365
+try:
+    versions = preprocess.data_versions('data')
+    customers_version = (versions['customers'], date.today())
+    df_customers = load_customers(*customers_version)
+    products_version = versions['products']
+    df_products = load_products(products_version)
+    # Versi tersimpan di database (sequence + statistik tabel), juga di mode live,
+    # supaya kunci cache dan file export tetap berlaku lintas proses dan restart
+    order_details_version = versions['order_details']
+    if LIVE_REFRESH:
+        # Cube live punya versinya sendiri (bisa beda dari versi database sesaat),
+        # jadi semua yang dihitung dari cube memakai rollups_version
+        live_version, live_cubes = live.snapshot(live_orders())
+        rollups_version = (order_details_version, live_version)
+    else:
+        # Dimuat di sini supaya data yang hilang/rusak ditangani blok except di bawah
+        load_rollups(order_details_version)
+        rollups_version = order_details_version
+except FileNotFoundError:
+    st.error("⚠️ File CSV tidak ditemukan! Pastikan folder 'data' berisi file CSV.")
+    st.stop()
+except DB_ERRORS as e:
+    st.error(f"⚠️ Tidak bisa membaca data dari database: {e}")
+    st.stop()
+
+def current_rollups():
+    """Cube harian untuk versi tabel order yang sedang dipakai"""
+    return live_cubes if LIVE_REFRESH else load_rollups(order_details_version)
 
 # =====================================================
 # FUNGSI: TAMPILAN PELANGGAN
@@ -52,8 +147,9 @@ def tabelCustomers_dan_export():
 
     # Sidebar: Filter Rentang Usia
     st.sidebar.header("Filter Rentang Usia")
-    min_age = int(df_customers['Age'].min())
-    max_age = int(df_customers['Age'].max())
+    age_index = load_age_index(*customers_version)
+    min_age = age_index['min_age']
+    max_age = age_index['max_age']
     age_range = st.sidebar.slider(
         "Pilih Rentang Usia",
         min_value=min_age,
@@ -63,7 +159,7 @@ def tabelCustomers_dan_export():
     )
 
     # Terapkan filter usia
-    filtered_df = df_customers[df_customers['Age'].between(*age_range)]
+    filtered_df = preprocess.filter_age(df_customers, age_index, *age_range)
 
     # Tampilkan tabel pelanggan
     st.markdown("### 📋 Tabel Data Pelanggan")
@@ -91,21 +187,16 @@ def tabelCustomers_dan_export():
     # Parse selection
     sort_by = sort_selection.rsplit(" (", 1)[0]
     ascending = "ASC" in sort_selection
-    sorted_df = filtered_df.sort_values(by=sort_by, ascending=ascending)
+    sorted_df = sort_index.sort_frame(
+        load_sort_index('customers', customers_version, df_customers), sort_by, ascending, filtered_df
+    )
     
-    st.dataframe(sorted_df[showdata], use_container_width=True)
+    pagination.paged_table(sorted_df[showdata], key="customer")
 
-    # Export CSV
-    @st.cache_data
-    def convert_df_to_csv(_df):
-        return _df.to_csv(index=False).encode('utf-8')
-    
-    csv = convert_df_to_csv(sorted_df[showdata])
-    st.download_button(
-        label="⬇️ Download Data Pelanggan sebagai CSV",
-        data=csv,
-        file_name='data_pelanggan.csv',
-        mime='text/csv'
+    # Export
+    downloads.download_widget(
+        sorted_df[showdata], "⬇️ Download Data Pelanggan", 'data_pelanggan', key="customer",
+        cache_key=('customers', customers_version, age_range, sort_by, ascending, tuple(showdata))
     )
 
 # =====================================================
@@ -114,20 +205,15 @@ def tabelCustomers_dan_export():
 def tabelOrders_dan_chart():
     """Menampilkan data order dengan grafik pembelian barang"""
     
-    df_local = df_order_details.copy()
-    if df_local.empty:
+    cubes = current_rollups()
+    if cubes['orders'].empty:
         st.info("Belum ada data order untuk ditampilkan.")
         return
 
-    # Konversi tipe data
-    df_local['order_date'] = pd.to_datetime(df_local['order_date'])
-    df_local['quantity'] = pd.to_numeric(df_local['quantity'], errors='coerce').fillna(0).astype(int)
-    df_local['subtotal'] = pd.to_numeric(df_local['subtotal'], errors='coerce')
-
     # Sidebar: Filter tanggal dan pencarian produk
     st.sidebar.header("Filter Order")
-    min_date = df_local['order_date'].min().date()
-    max_date = df_local['order_date'].max().date()
+    min_date = cubes['orders']['date'].min().date()
+    max_date = cubes['orders']['date'].max().date()
     start_date, end_date = st.sidebar.date_input(
         "Rentang Tanggal Order",
         value=(min_date, max_date),
@@ -137,28 +223,36 @@ def tabelOrders_dan_chart():
     )
     search_product = st.sidebar.text_input("Cari Nama Produk", value="", key="order_search_product")
 
-    # Terapkan filter tanggal
-    mask = (df_local['order_date'].dt.date >= start_date) & (df_local['order_date'].dt.date <= end_date)
-    df_local = df_local[mask]
-    
-    # Terapkan filter nama produk
-    if search_product:
-        df_local = df_local[df_local['product_name'].str.contains(search_product, case=False, na=False)]
+    if data_store.DATA_SOURCE == 'db':
+        # Filter tanggal dan nama produk dijalankan PostgreSQL (WHERE berparameter),
+        # chart dari total per produk / per hari (GROUP BY), tanpa baris order
+        product_totals = load_order_totals('product', order_details_version, start_date, end_date, search_product)
+        daily_totals = load_order_totals('date', order_details_version, start_date, end_date, search_product)
+        total_rows = int(daily_totals['lines'].sum())
+        order_columns = list(config.ORDER_DETAILS_EXPORT_COLUMNS)
+        agg_product = product_totals[['product_id', 'product_name', 'quantity', 'revenue']]
+        daily = rollups.period_totals(daily_totals, 'D')
+    else:
+        # Filter tanggal: hanya order dalam rentang yang dibaca dari folder data
+        df_range = load_order_details_range(order_details_version, start_date, end_date)
+        df_local = df_range
+
+        # Terapkan filter nama produk
+        product_ids = None
+        if search_product:
+            product_ids = search.search_ids(load_product_search(products_version), search_product)
+            df_local = df_local[df_local['product_id'].isin(product_ids)]
+        order_columns = df_local.columns.tolist()
+
+        # Agregasi dari cube harian (bukan dari baris order)
+        agg_product = rollups.product_totals(cubes, start_date, end_date, product_ids)
+        daily = rollups.roll_up(cubes, 'D', start_date, end_date, product_ids)
 
     # Agregasi: jumlah barang terbeli per produk
-    agg_product = (
-        df_local.groupby(['product_id', 'product_name'], as_index=False)
-        .agg(items_terbeli=('quantity', 'sum'), pendapatan=('subtotal', 'sum'))
-        .sort_values(['items_terbeli', 'pendapatan'], ascending=[False, False])
-    )
+    agg_product = agg_product.rename(columns={'quantity': 'items_terbeli', 'revenue': 'pendapatan'})
 
     # Agregasi: tren harian (jumlah item dan pendapatan)
-    daily = (
-        df_local.assign(date=df_local['order_date'].dt.date)
-        .groupby('date', as_index=False)
-        .agg(items=('quantity', 'sum'), revenue=('subtotal', 'sum'))
-        .sort_values('date')
-    )
+    daily = daily.rename(columns={'Date': 'date', 'Quantity': 'items', 'Revenue': 'revenue'})
 
     # Metrik ringkasan
     total_items = int(agg_product['items_terbeli'].sum()) if not agg_product.empty else 0
@@ -173,7 +267,8 @@ def tabelOrders_dan_chart():
     # Chart: Top Produk berdasarkan Jumlah Terbeli
     st.markdown("### 📈 Top Produk berdasarkan Jumlah Terbeli")
     top_n = st.slider("Tampilkan Top N", min_value=5, max_value=50, value=10, step=5, key="order_top_n")
-    st.bar_chart(agg_product.set_index('product_name')['items_terbeli'].head(top_n), use_container_width=True)
+    top_products = topk.top_rows(agg_product, top_n, ['items_terbeli', 'pendapatan'])
+    st.bar_chart(top_products.set_index('product_name')['items_terbeli'], use_container_width=True)
 
     # Chart: Tren Harian (Pembelian dan Pendapatan) - Side by Side
     st.markdown("### 📉 Tren Harian")
@@ -195,14 +290,17 @@ def tabelOrders_dan_chart():
     ]
     show_cols = st.multiselect(
         "Pilih Kolom Rincian",
-        options=df_local.columns.tolist(),
-        default=default_cols if all(c in df_local.columns for c in default_cols) else df_local.columns.tolist(),
+        options=order_columns,
+        default=default_cols if all(c in order_columns for c in default_cols) else order_columns,
         key="order_columns"
     )
     
-    # Sorting dengan dropdown tunggal
+    # Sorting dengan dropdown tunggal (mode DB: hanya kolom yang bisa diurutkan di SQL)
+    sort_columns_order = order_columns
+    if data_store.DATA_SOURCE == 'db':
+        sort_columns_order = [col for col in sort_columns_order if col in config.ORDER_DETAILS_SORT_COLUMNS]
     sort_options_order = []
-    for col in df_local.columns:
+    for col in sort_columns_order:
         sort_options_order.append(f"{col} (ASC ↑)")
         sort_options_order.append(f"{col} (DESC ↓)")
     
@@ -216,21 +314,24 @@ def tabelOrders_dan_chart():
     # Parse selection
     sort_by_order = sort_selection_order.rsplit(" (", 1)[0]
     ascending_order = "ASC" in sort_selection_order
-    sorted_order_df = df_local.sort_values(by=sort_by_order, ascending=ascending_order)
-    
-    st.dataframe(sorted_order_df[show_cols], use_container_width=True)
-
-    # Export CSV
-    @st.cache_data
-    def convert_df_to_csv(_df):
-        return _df.to_csv(index=False).encode('utf-8')
-
-    csv = convert_df_to_csv(sorted_order_df[show_cols])
-    st.download_button(
-        label="⬇️ Download Rincian Order CSV",
-        data=csv,
-        file_name='rincian_order.csv',
-        mime='text/csv'
+    if data_store.DATA_SOURCE == 'db':
+        # Halaman tabel dan file download diurutkan PostgreSQL, bukan di memori
+        filters = {'start_date': start_date, 'end_date': end_date, 'product_search': search_product}
+        pagination.keyset_table(filters, sort_by_order, ascending_order, show_cols, key="order")
+        export_source = downloads.order_details_source(filters, sort_by_order, ascending_order, show_cols, total_rows)
+    else:
+        sorted_order_df = sort_index.sort_frame(
+            load_sort_index(('order_details', start_date, end_date), order_details_version, df_range),
+            sort_by_order, ascending_order, df_local
+        )
+        pagination.paged_table(sorted_order_df[show_cols], key="order")
+        export_source = sorted_order_df[show_cols]
+
+    # Export
+    downloads.download_widget(
+        export_source, "⬇️ Download Rincian Order", 'rincian_order', key="order",
+        cache_key=('order_details', order_details_version, start_date, end_date, search_product,
+                   sort_by_order, ascending_order, tuple(show_cols))
     )
 
 # =====================================================
@@ -239,51 +340,35 @@ def tabelOrders_dan_chart():
 def tabelProducts_dan_chart():
     """Menampilkan produk dengan diagram batang penjualan"""
     
-    df_prod = df_products.copy()
+    df_prod = df_products
     if df_prod.empty:
         st.info("Belum ada data produk untuk ditampilkan.")
         return
 
-    # Konversi tipe data
-    df_prod['price'] = pd.to_numeric(df_prod['price'], errors='coerce')
-    df_prod['stock'] = pd.to_numeric(df_prod['stock'], errors='coerce')
-
-    # Hitung total terjual per produk dari order_details
-    if not df_order_details.empty:
-        df_sales = df_order_details.copy()
-        df_sales['quantity'] = pd.to_numeric(df_sales['quantity'], errors='coerce').fillna(0).astype(int)
-        df_sales['subtotal'] = pd.to_numeric(df_sales['subtotal'], errors='coerce')
-        
-        sales_summary = (
-            df_sales.groupby(['product_id', 'product_name'], as_index=False)
-            .agg(total_terjual=('quantity', 'sum'), total_pendapatan=('subtotal', 'sum'))
-        )
-        
-        # Gabungkan dengan data produk
-        df_prod = df_prod.merge(
-            sales_summary[['product_id', 'total_terjual', 'total_pendapatan']],
-            on='product_id',
-            how='left'
-        )
-        df_prod['total_terjual'] = df_prod['total_terjual'].fillna(0).astype(int)
-        df_prod['total_pendapatan'] = df_prod['total_pendapatan'].fillna(0)
-    else:
-        df_prod['total_terjual'] = 0
-        df_prod['total_pendapatan'] = 0.0
+    # Total terjual per produk dari order_details (dihitung sekali per versi data)
+    df_prod = load_products_with_sales(products_version, rollups_version, current_rollups()['product_sales'])
 
     # Sidebar: Filter
     st.sidebar.header("Filter Produk")
     search_name = st.sidebar.text_input("Cari Nama Produk", value="", key="product_search_name")
     
     # Terapkan filter nama dulu
-    df_filtered = df_prod.copy()
+    df_filtered = df_prod
     if search_name:
-        df_filtered = df_filtered[df_filtered['name'].str.contains(search_name, case=False, na=False)]
+        matches = search.search_ids(load_product_search(products_version), search_name)
+        df_filtered = df_filtered[df_filtered['product_id'].isin(matches)]
+    
+    # Tanpa pencarian nama, range dan filter harga dilayani index rentang harga
+    price_index = None if search_name else load_range_index('products', 'price', products_version, df_prod)
     
     # Hitung range harga dari data yang sudah difilter
+    price_filter = None
     if not df_filtered.empty:
-        price_min = float(df_filtered['price'].min())
-        price_max = float(df_filtered['price'].max())
+        if price_index is not None and range_index.value_range(price_index) is not None:
+            price_min, price_max = range_index.value_range(price_index)
+        else:
+            price_min = float(df_filtered['price'].min())
+            price_max = float(df_filtered['price'].max())
         
         # Hanya tampilkan slider jika ada range harga
         if price_max > price_min:
@@ -295,9 +380,13 @@ def tabelProducts_dan_chart():
                 key="product_price_range"
             )
             # Filter berdasarkan harga
-            df_filtered = df_filtered[
-                (df_filtered['price'] >= price_range[0]) & (df_filtered['price'] <= price_range[1])
-            ]
+            price_filter = price_range
+            if price_index is not None:
+                df_filtered = range_index.filter_range(df_filtered, price_index, *price_range)
+            else:
+                df_filtered = df_filtered[
+                    (df_filtered['price'] >= price_range[0]) & (df_filtered['price'] <= price_range[1])
+                ]
         else:
             st.sidebar.info(f"Harga: Rp {price_min:,.2f}")
 
@@ -321,11 +410,8 @@ def tabelProducts_dan_chart():
         st.warning("Tidak ada produk yang sesuai dengan filter.")
         return
     
-    # Sort berdasarkan total terjual
-    df_chart = df_filtered.sort_values('total_terjual', ascending=False)
-    
     # Slider untuk memilih jumlah produk yang ditampilkan
-    max_products = len(df_chart)
+    max_products = len(df_filtered)
     if max_products > 1:
         top_n = st.slider(
             "Tampilkan Top N Produk Terlaris",
@@ -338,7 +424,8 @@ def tabelProducts_dan_chart():
     else:
         top_n = max_products
     
-    chart_data = df_chart.head(top_n).set_index('name')[['total_terjual']]
+    # Hanya top_n produk yang dipilih dan diurutkan, bukan seluruh tabel produk
+    chart_data = topk.top_rows(df_filtered, top_n, 'total_terjual').set_index('name')[['total_terjual']]
     st.bar_chart(chart_data, use_container_width=True)
 
     # Tabel detail produk
@@ -367,27 +454,143 @@ def tabelProducts_dan_chart():
         # Parse selection
         sort_by_product = sort_selection_product.rsplit(" (", 1)[0]
         ascending_product = "ASC" in sort_selection_product
-        sorted_product_df = df_filtered.sort_values(by=sort_by_product, ascending=ascending_product)
-        
-        st.dataframe(
-            sorted_product_df[show_cols],
-            use_container_width=True
+        sorted_product_df = sort_index.sort_frame(
+            load_sort_index('products_sales', (products_version, rollups_version), df_prod),
+            sort_by_product, ascending_product, df_filtered
         )
+        
+        pagination.paged_table(sorted_product_df[show_cols], key="product")
 
-        # Export CSV
-        @st.cache_data
-        def convert_df_to_csv(_df):
-            return _df.to_csv(index=False).encode('utf-8')
-
-        csv = convert_df_to_csv(sorted_product_df[show_cols])
-        st.download_button(
-            label="⬇️ Download Data Produk CSV",
-            data=csv,
-            file_name='data_produk.csv',
-            mime='text/csv'
+        # Export
+        downloads.download_widget(
+            sorted_product_df[show_cols], "⬇️ Download Data Produk", 'data_produk', key="product",
+            cache_key=('products', products_version, rollups_version, search_name, price_filter,
+                       sort_by_product, ascending_product, tuple(show_cols))
         )
 
 
+# =====================================================
+# CHART DASHBOARD UTAMA (cache lintas sesi)
+# =====================================================
+# Setiap builder mengembalikan (figure, tabel agregasi). Hasilnya disimpan di
+# chart_cache per tipe chart + versi data, jadi semua sesi berbagi satu hitungan.
+def chart_pie():
+    # Kategorisasi produk berdasarkan harga
+    df_prod = df_products.assign(price_category=pd.cut(df_products['price'],
+                                                       bins=[0, 30000, 60000, 80000, float('inf')],
+                                                       labels=['Low (< 30k)', 'Medium (30k-60k)', 'High (60k-80k)', 'Premium (> 80k)']))
+    
+    category_counts = df_prod['price_category'].value_counts()
+    
+    # Buat pie chart dengan Plotly (INTERAKTIF)
+    fig = px.pie(
+        values=category_counts.values,
+        names=category_counts.index,
+        title='Distribusi Produk Berdasarkan Kategori Harga',
+        color_discrete_sequence=['#ff9999', '#66b3ff', '#99ff99', '#ffcc99'],
+        hole=0.3  # Donut chart
+    )
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate='<b>%{label}</b><br>Jumlah: %{value}<br>Persentase: %{percent}<extra></extra>'
+    )
+    fig.update_layout(
+        height=500,
+        font=dict(size=14),
+        showlegend=True
+    )
+    return fig, category_counts.rename_axis('Category').reset_index(name='Count')
+
+def chart_area():
+    # Agregasi pendapatan per hari (dari cube harian)
+    daily_revenue = rollups.roll_up(current_rollups(), 'D')[['Date', 'Revenue']]
+    
+    # Buat area chart dengan Plotly (INTERAKTIF)
+    fig = px.area(
+        daily_revenue,
+        x='Date',
+        y='Revenue',
+        title='Tren Pendapatan Harian',
+        labels={'Revenue': 'Pendapatan (Rp)', 'Date': 'Tanggal'}
+    )
+    fig.update_traces(
+        line_color='#0d47a1',
+        fillcolor='rgba(31, 119, 180, 0.3)',
+        hovertemplate='<b>Tanggal:</b> %{x}<br><b>Pendapatan:</b> Rp %{y:,.0f}<extra></extra>'
+    )
+    fig.update_layout(
+        height=500,
+        hovermode='x unified',
+        xaxis_title='Tanggal',
+        yaxis_title='Pendapatan (Rp)',
+        font=dict(size=12)
+    )
+    return fig, daily_revenue
+
+def chart_bar():
+    # 15 produk terlaris dijaga terus di product_sales, nama hanya untuk 15 produk itu
+    cubes = current_rollups()
+    top = rollups.top_products(cubes['product_sales'], 15)
+    product_sales = rollups.with_names(top.iloc[::-1], cubes['products']).reset_index()
+    product_sales.columns = ['Product', 'Quantity']
+    
+    # Buat bar chart horizontal dengan Plotly (INTERAKTIF)
+    fig = px.bar(
+        product_sales,
+        x='Quantity',
+        y='Product',
+        orientation='h',
+        title='Top 15 Produk Terlaris',
+        labels={'Quantity': 'Jumlah Terjual (Unit)', 'Product': 'Nama Produk'},
+        color='Quantity',
+        color_continuous_scale='Viridis'
+    )
+    fig.update_traces(
+        hovertemplate='<b>%{y}</b><br>Terjual: %{x:,} unit<extra></extra>'
+    )
+    fig.update_layout(
+        height=600,
+        showlegend=False,
+        xaxis_title='Jumlah Terjual (Unit)',
+        yaxis_title='Nama Produk',
+        font=dict(size=12)
+    )
+    return fig, product_sales
+
+def chart_line():
+    # Hitung jumlah order per hari (dari cube harian)
+    daily_orders = rollups.roll_up(current_rollups(), 'D')[['Date', 'Orders']]
+    
+    # Buat line chart dengan Plotly (INTERAKTIF)
+    fig = px.line(
+        daily_orders,
+        x='Date',
+        y='Orders',
+        title='Tren Jumlah Order Per Hari',
+        labels={'Orders': 'Jumlah Order', 'Date': 'Tanggal'},
+        markers=True
+    )
+    fig.update_traces(
+        line_color='#d32f2f',
+        marker=dict(size=8),
+        hovertemplate='<b>Tanggal:</b> %{x}<br><b>Jumlah Order:</b> %{y}<extra></extra>'
+    )
+    fig.update_layout(
+        height=500,
+        hovermode='x unified',
+        xaxis_title='Tanggal',
+        yaxis_title='Jumlah Order',
+        font=dict(size=12)
+    )
+    return fig, daily_orders
+
+def tampilkan_chart(visualization_type, version, build):
+    """Render chart dari cache lintas sesi, kembalikan tabel agregasinya untuk statistik"""
+    fig_json, data = chart_cache.cached_chart((visualization_type, version), build)
+    st.plotly_chart(json.loads(fig_json), use_container_width=True)
+    return data
+
 # =====================================================
 # FUNGSI: DASHBOARD UTAMA
 # =====================================================
@@ -417,43 +620,15 @@ def dashboard_utama():
         Visualisasi ini membantu memahami komposisi produk di toko berdasarkan segmen harga.
         """)
         
-        # Kategorisasi produk berdasarkan harga
-        df_prod = df_products.copy()
-        df_prod['price'] = pd.to_numeric(df_prod['price'], errors='coerce')
-        
-        # Buat kategori harga
-        df_prod['price_category'] = pd.cut(df_prod['price'], 
-                                            bins=[0, 30000, 60000, 80000, float('inf')],
-                                            labels=['Low (< 30k)', 'Medium (30k-60k)', 'High (60k-80k)', 'Premium (> 80k)'])
-        
-        category_counts = df_prod['price_category'].value_counts()
-        
-        # Buat pie chart dengan Plotly (INTERAKTIF)
-        fig = px.pie(
-            values=category_counts.values,
-            names=category_counts.index,
-            title='Distribusi Produk Berdasarkan Kategori Harga',
-            color_discrete_sequence=['#ff9999', '#66b3ff', '#99ff99', '#ffcc99'],
-            hole=0.3  # Donut chart
-        )
-        fig.update_traces(
-            textposition='inside',
-            textinfo='percent+label',
-            hovertemplate='<b>%{label}</b><br>Jumlah: %{value}<br>Persentase: %{percent}<extra></extra>'
-        )
-        fig.update_layout(
-            height=500,
-            font=dict(size=14),
-            showlegend=True
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        category_counts = tampilkan_chart(visualization_type, products_version, chart_pie)
+        df_prod = df_products
         
         # Tampilkan statistik
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Total Produk", len(df_prod))
         with col2:
-            most_common = category_counts.index[0]
+            most_common = category_counts['Category'].iloc[0]
             st.metric("Kategori Terbanyak", most_common)
         with col3:
             avg_price = df_prod['price'].mean()
@@ -469,37 +644,8 @@ def dashboard_utama():
         pola penjualan dan mengidentifikasi periode puncak atau penurunan.
         """)
         
-        if not df_order_details.empty:
-            df_orders = df_order_details.copy()
-            df_orders['order_date'] = pd.to_datetime(df_orders['order_date'])
-            df_orders['subtotal'] = pd.to_numeric(df_orders['subtotal'], errors='coerce')
-            
-            # Agregasi pendapatan per hari
-            daily_revenue = df_orders.groupby(df_orders['order_date'].dt.date)['subtotal'].sum().reset_index()
-            daily_revenue.columns = ['Date', 'Revenue']
-            daily_revenue = daily_revenue.sort_values('Date')
-            
-            # Buat area chart dengan Plotly (INTERAKTIF)
-            fig = px.area(
-                daily_revenue,
-                x='Date',
-                y='Revenue',
-                title='Tren Pendapatan Harian',
-                labels={'Revenue': 'Pendapatan (Rp)', 'Date': 'Tanggal'}
-            )
-            fig.update_traces(
-                line_color='#0d47a1',
-                fillcolor='rgba(31, 119, 180, 0.3)',
-                hovertemplate='<b>Tanggal:</b> %{x}<br><b>Pendapatan:</b> Rp %{y:,.0f}<extra></extra>'
-            )
-            fig.update_layout(
-                height=500,
-                hovermode='x unified',
-                xaxis_title='Tanggal',
-                yaxis_title='Pendapatan (Rp)',
-                font=dict(size=12)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if not current_rollups()['orders'].empty:
+            daily_revenue = tampilkan_chart(visualization_type, rollups_version, chart_area)
             
             # Statistik
             col1, col2, col3, col4 = st.columns(4)
@@ -528,47 +674,19 @@ def dashboard_utama():
         produk best-seller dan membantu strategi inventory management.
         """)
         
-        if not df_order_details.empty:
-            df_sales = df_order_details.copy()
-            df_sales['quantity'] = pd.to_numeric(df_sales['quantity'], errors='coerce').fillna(0)
-            
-            # Agregasi penjualan per produk
-            product_sales = df_sales.groupby('product_name')['quantity'].sum().sort_values(ascending=True).tail(15).reset_index()
-            product_sales.columns = ['Product', 'Quantity']
-            
-            # Buat bar chart horizontal dengan Plotly (INTERAKTIF)
-            fig = px.bar(
-                product_sales,
-                x='Quantity',
-                y='Product',
-                orientation='h',
-                title='Top 15 Produk Terlaris',
-                labels={'Quantity': 'Jumlah Terjual (Unit)', 'Product': 'Nama Produk'},
-                color='Quantity',
-                color_continuous_scale='Viridis'
-            )
-            fig.update_traces(
-                hovertemplate='<b>%{y}</b><br>Terjual: %{x:,} unit<extra></extra>'
-            )
-            fig.update_layout(
-                height=600,
-                showlegend=False,
-                xaxis_title='Jumlah Terjual (Unit)',
-                yaxis_title='Nama Produk',
-                font=dict(size=12)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if not current_rollups()['orders'].empty:
+            product_sales = tampilkan_chart(visualization_type, rollups_version, chart_bar)
             
             # Statistik
             col1, col2, col3 = st.columns(3)
             with col1:
-                total_sold = df_sales['quantity'].sum()
+                total_sold = current_rollups()['product_sales']['quantity'].sum()
                 st.metric("Total Unit Terjual", f"{int(total_sold):,}")
             with col2:
-                best_seller = product_sales.index[-1]
+                best_seller = product_sales['Product'].iloc[-1]
                 st.metric("Best Seller", best_seller)
             with col3:
-                best_qty = product_sales.values[-1]
+                best_qty = product_sales['Quantity'].iloc[-1]
                 st.metric("Terjual", f"{int(best_qty):,} unit")
         else:
             st.warning("Tidak ada data penjualan untuk ditampilkan.")
@@ -583,42 +701,13 @@ def dashboard_utama():
         hari-hari sibuk, dan merencanakan kapasitas operasional.
         """)
         
-        if not df_order_details.empty:
-            df_orders = df_order_details.copy()
-            df_orders['order_date'] = pd.to_datetime(df_orders['order_date'])
-            
-            # Hitung jumlah order per hari
-            daily_orders = df_orders.groupby(df_orders['order_date'].dt.date)['order_id'].nunique().reset_index()
-            daily_orders.columns = ['Date', 'Orders']
-            daily_orders = daily_orders.sort_values('Date')
-            
-            # Buat line chart dengan Plotly (INTERAKTIF)
-            fig = px.line(
-                daily_orders,
-                x='Date',
-                y='Orders',
-                title='Tren Jumlah Order Per Hari',
-                labels={'Orders': 'Jumlah Order', 'Date': 'Tanggal'},
-                markers=True
-            )
-            fig.update_traces(
-                line_color='#d32f2f',
-                marker=dict(size=8),
-                hovertemplate='<b>Tanggal:</b> %{x}<br><b>Jumlah Order:</b> %{y}<extra></extra>'
-            )
-            fig.update_layout(
-                height=500,
-                hovermode='x unified',
-                xaxis_title='Tanggal',
-                yaxis_title='Jumlah Order',
-                font=dict(size=12)
-            )
-            st.plotly_chart(fig, use_container_width=True)
+        if not current_rollups()['orders'].empty:
+            daily_orders = tampilkan_chart(visualization_type, rollups_version, chart_line)
             
             # Statistik
             col1, col2, col3, col4 = st.columns(4)
             with col1:
-                total_orders = df_orders['order_id'].nunique()
+                total_orders = int(daily_orders['Orders'].sum())
                 st.metric("Total Order", f"{total_orders:,}")
             with col2:
                 avg_orders = daily_orders['Orders'].mean()
@@ -716,4 +805,9 @@ elif menu_option == "Data Pelanggan":
 elif menu_option == "Data Produk":
     tabelProducts_dan_chart()
 elif menu_option == "Data Order":
-    tabelOrders_dan_chart()
\ No newline at end of file
+    tabelOrders_dan_chart()
+
+# Ada export background yang belum selesai: render ulang sebentar lagi untuk update progres
+if st.session_state.pop('export_running', False):
+    time.sleep(1)
+    st.rerun()
\ No newline at end of file
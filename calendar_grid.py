@@ -0,0 +1,69 @@
+"""Agregasi kalender (bulan x hari x jam) untuk tab Time Analysis
+
+Bulan, hari dan jam order sudah berupa angka kecil dari preprocess (month
+1-12, kode day_name 0-6 mulai Senin, hour 0-23). Ketiganya digabung menjadi
+satu index sel (bulan * 168 + hari * 24 + jam), lalu satu np.bincount
+menghasilkan grid 12 x 7 x 24 berisi total revenue dan jumlah baris.
+Heatmap bulan x hari, matriks hari x jam, total per hari dan per jam
+tinggal menjumlahkan sumbu grid itu, tanpa groupby atas string nama hari
+atau bulan.
+"""
+import numpy as np
+import pandas as pd
+
+from preprocess import DAY_ORDER, MONTH_ORDER
+
+SHAPE = (12, 7, 24)
+
+def build_grid(df_order_details, value='subtotal'):
+    """{'revenue': grid total value, 'lines': grid jumlah baris}, bentuk (bulan, hari, jam).
+
+    Baris tanpa order_date (month/hour kosong) tidak masuk grid.
+    """
+    valid = df_order_details['month'].notna()
+    if not valid.all():
+        df_order_details = df_order_details[valid]
+    cell = _cell(df_order_details['month'], df_order_details['day_name'].cat.codes, df_order_details['hour'])
+    size = SHAPE[0] * SHAPE[1] * SHAPE[2]
+    weights = df_order_details[value].to_numpy(dtype='float64')
+    return {
+        'revenue': np.bincount(cell, weights=weights, minlength=size).reshape(SHAPE),
+        'lines': np.bincount(cell, minlength=size).reshape(SHAPE),
+    }
+
+def grid_from_cells(cells):
+    """Grid yang sama dari total per sel yang sudah dihitung database
+    (config.load_order_calendar_df: month 1-12, day 0-6, hour, revenue, lines)"""
+    cell = _cell(cells['month'], cells['day'], cells['hour'])
+    size = SHAPE[0] * SHAPE[1] * SHAPE[2]
+    lines = np.bincount(cell, weights=cells['lines'].to_numpy(dtype='float64'), minlength=size)
+    return {
+        'revenue': np.bincount(cell, weights=cells['revenue'].to_numpy(dtype='float64'), minlength=size).reshape(SHAPE),
+        'lines': lines.astype('int64').reshape(SHAPE),
+    }
+
+def _cell(month, day, hour):
+    return ((month.to_numpy(dtype='int64') - 1) * 168
+            + day.to_numpy(dtype='int64') * 24
+            + hour.to_numpy(dtype='int64'))
+
+def by_day(grid):
+    """Total per hari (Senin..Minggu), hari tanpa order bernilai 0"""
+    return pd.Series(grid['revenue'].sum(axis=(0, 2)), index=pd.Index(DAY_ORDER, name='day_name'))
+
+def by_hour(grid):
+    """Total per jam, hanya jam yang ada order-nya"""
+    lines = grid['lines'].sum(axis=(0, 1))
+    hours = np.flatnonzero(lines)
+    return pd.Series(grid['revenue'].sum(axis=(0, 1))[hours], index=pd.Index(hours, name='hour'))
+
+def day_hour(grid):
+    """Matriks 7 x 24 (hari x jam)"""
+    return pd.DataFrame(grid['revenue'].sum(axis=0), index=pd.Index(DAY_ORDER, name='day_name'),
+                        columns=pd.RangeIndex(24, name='hour'))
+
+def month_day(grid):
+    """Matriks hari x bulan (7 x 12), hanya bulan yang ada order-nya"""
+    months = np.flatnonzero(grid['lines'].sum(axis=(1, 2)))
+    return pd.DataFrame(grid['revenue'].sum(axis=2)[months].T, index=pd.Index(DAY_ORDER, name='day_name'),
+                        columns=pd.Index([MONTH_ORDER[m] for m in months], name='month_name'))
@@ -0,0 +1,70 @@
+"""Cache chart dashboard yang dipakai bersama semua sesi
+
+Chart yang sama (tipe chart + filter + versi data) cukup dihitung sekali:
+hasil agregasinya dan figure Plotly yang sudah diserialisasi ke JSON
+disimpan di memori proses, jadi sesi lain yang membuka chart itu tinggal
+mengambilnya. Jika beberapa sesi meminta chart yang belum ada bersamaan,
+hanya satu yang menghitung, sisanya menunggu hasilnya.
+
+Ukuran cache dibatasi MAX_BYTES (perkiraan ukuran JSON + tabel agregasi).
+Jika penuh, chart yang paling lama tidak dipakai dibuang lebih dulu (LRU).
+"""
+import os
+import threading
+from collections import OrderedDict
+
+MAX_BYTES = int(os.environ.get('DASHBOARD_CHART_CACHE_MB', 64)) * 1024 * 1024
+
+_entries = OrderedDict()  # key -> (figure JSON, tabel agregasi, ukuran)
+_size = 0
+_lock = threading.Lock()
+_key_locks = {}  # key -> lock untuk chart yang sedang dihitung
+
+def _entry_size(fig_json, data):
+    return len(fig_json) + int(data.memory_usage(deep=True).sum())
+
+def _get(key):
+    with _lock:
+        entry = _entries.get(key)
+        if entry is None:
+            return None
+        _entries.move_to_end(key)
+        return entry[:2]
+
+def _put(key, fig_json, data):
+    global _size
+    size = _entry_size(fig_json, data)
+    with _lock:
+        if key in _entries:
+            _size -= _entries.pop(key)[2]
+        _entries[key] = (fig_json, data, size)
+        _size += size
+        # Entry terbaru selalu disimpan walau sendirian melebihi batas
+        while _size > MAX_BYTES and len(_entries) > 1:
+            _size -= _entries.popitem(last=False)[1][2]
+
+def cached_chart(key, build):
+    """(figure JSON, tabel agregasi) untuk key.
+
+    build() -> (figure Plotly, DataFrame agregasi) hanya dijalankan jika key
+    belum ada di cache. key harus memuat tipe chart, filter, dan versi data.
+    Perlakukan tabel agregasi sebagai data baca-saja.
+    """
+    entry = _get(key)
+    if entry is not None:
+        return entry
+    with _lock:
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+    with key_lock:
+        # Sesi lain mungkin sudah selesai menghitung selama kita menunggu
+        entry = _get(key)
+        if entry is not None:
+            return entry
+        try:
+            fig, data = build()
+            fig_json = fig.to_json()
+            _put(key, fig_json, data)
+        finally:
+            with _lock:
+                _key_locks.pop(key, None)
+    return fig_json, data
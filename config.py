@@ -1,7 +1,29 @@
+import io
+import os
+import threading
+import time
+import atexit
+import itertools
+import select
+from contextlib import contextmanager
+
+import pandas as pd
 import psycopg2
+from psycopg2 import pool as pg_pool
+from psycopg2 import sql
+
+from schema import (
+    CUSTOMER_DTYPES, CUSTOMER_DATE_COLUMNS,
+    PRODUCT_DTYPES, PRODUCT_DATE_COLUMNS,
+    ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS,
+    ORDER_TOTALS_DTYPES, ORDER_TOTALS_DATE_COLUMNS, ORDER_CALENDAR_DTYPES,
+    DAILY_REVENUE_DTYPES, DAILY_REVENUE_DATE_COLUMNS,
+    PRODUCT_SALES_DTYPES, PRODUCT_SALES_DATE_COLUMNS,
+    CUSTOMER_SPENDING_DTYPES, CUSTOMER_SPENDING_DATE_COLUMNS,
+)
 
-# Koneksi ke database PostgreSQL
-conn = psycopg2.connect(
+# Pengaturan koneksi ke database PostgreSQL
+DB_CONFIG = dict(
     host="localhost",
     port="5432",          # port default PostgreSQL
     user="postgres",      # ganti sesuai user PostgreSQL kamu
@@ -9,73 +31,701 @@ conn = psycopg2.connect(
     dbname="sales_db"     # nama database
 )
 
-print("Koneksi PostgreSQL berhasil!")
+# Ukuran pool koneksi (bisa diatur lewat environment variable)
+POOL_MIN_CONN = int(os.environ.get("DB_POOL_MIN", 1))
+POOL_MAX_CONN = int(os.environ.get("DB_POOL_MAX", 10))
+
+# Koneksi yang menganggur lebih lama dari ini (detik) dicek dulu sebelum dipakai
+HEALTH_CHECK_INTERVAL = float(os.environ.get("DB_HEALTH_CHECK_INTERVAL", 30))
+
+# Jumlah baris per batch untuk mode streaming (server-side cursor)
+STREAM_BATCH_SIZE = int(os.environ.get("DB_STREAM_BATCH_SIZE", 5000))
+
+# Interval refresh materialized view oleh scheduler (detik)
+MV_REFRESH_INTERVAL = float(os.environ.get("DB_MV_REFRESH_INTERVAL", 300))
+
+# Berapa kali query diulang jika koneksi putus (misal server PostgreSQL restart)
+QUERY_RETRIES = 2
+
+# Berapa id order_details di bawah watermark yang masih ditunggu (lihat pending_order_detail_ids)
+PENDING_ID_WINDOW = int(os.environ.get("DB_PENDING_ID_WINDOW", 10000))
+
+_pool = None
+_pool_lock = threading.Lock()
+# Membatasi peminjaman supaya thread menunggu koneksi bebas, bukan error "pool exhausted"
+_pool_slots = threading.BoundedSemaphore(POOL_MAX_CONN)
+_last_used = {}  # id(conn) -> waktu terakhir koneksi dikembalikan ke pool
+_cursor_seq = itertools.count(1)
+
+# ============================
+# Pool koneksi
+# ============================
+
+def get_pool():
+    """Ambil pool koneksi, dibuat sekali saja saat pertama dibutuhkan"""
+    global _pool
+    if _pool is None or _pool.closed:
+        with _pool_lock:
+            if _pool is None or _pool.closed:
+                _pool = pg_pool.ThreadedConnectionPool(POOL_MIN_CONN, POOL_MAX_CONN, **DB_CONFIG)
+                print("Koneksi PostgreSQL berhasil!")
+    return _pool
+
+def close_pool():
+    """Tutup semua koneksi di pool"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _last_used.clear()
+
+atexit.register(close_pool)
+
+def _is_alive(conn):
+    """Cek apakah koneksi masih bisa dipakai (health check)"""
+    if conn.closed:
+        return False
+    idle = time.monotonic() - _last_used.get(id(conn), 0)
+    if idle < HEALTH_CHECK_INTERVAL:
+        return True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        conn.rollback()
+        return True
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        return False
+
+def _checkout(pool):
+    """Ambil koneksi sehat dari pool, buang koneksi yang sudah mati"""
+    for _ in range(POOL_MAX_CONN + 1):
+        conn = pool.getconn()
+        if _is_alive(conn):
+            return conn
+        _last_used.pop(id(conn), None)
+        pool.putconn(conn, close=True)
+    raise psycopg2.OperationalError("Tidak bisa mendapatkan koneksi PostgreSQL yang sehat")
+
+@contextmanager
+def get_connection():
+    """Pinjam satu koneksi dari pool, otomatis dikembalikan setelah selesai"""
+    pool = get_pool()
+    with _pool_slots:
+        conn = _checkout(pool)
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            broken = broken or bool(conn.closed)
+            if broken:
+                # Satu koneksi putus biasanya berarti server restart dan koneksi
+                # lain di pool ikut mati: lupakan semua waktu pakai supaya setiap
+                # koneksi di-health-check lagi sebelum dipinjam (termasuk oleh retry)
+                _last_used.clear()
+            else:
+                _last_used[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=broken)
+
+@contextmanager
+def get_cursor():
+    """Cursor baru untuk setiap pemanggilan, jadi aman dipakai banyak sesi sekaligus"""
+    with get_connection() as conn:
+        with conn.cursor() as cur:
+            yield cur
+
+def fetch_all(query, params=None):
+    """Jalankan query dan ambil semua baris, diulang jika koneksi putus"""
+    for attempt in range(QUERY_RETRIES):
+        try:
+            with get_cursor() as cur:
+                cur.execute(query, params)
+                return cur.fetchall()
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt == QUERY_RETRIES - 1:
+                raise
+
+def stream_batches(query, params=None, batch_size=STREAM_BATCH_SIZE):
+    """Ambil hasil query per batch lewat named (server-side) cursor.
+
+    Baris tetap di server PostgreSQL dan hanya dikirim sebanyak
+    batch_size setiap kali, jadi memori tetap kecil berapapun ukuran tabel.
+    Koneksi dipinjam dari pool selama iterator belum habis/ditutup.
+    """
+    with get_connection() as conn:
+        with conn.cursor(name=f"stream_{next(_cursor_seq)}") as cur:
+            cur.itersize = batch_size
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+def _run(query, stream=False, batch_size=STREAM_BATCH_SIZE):
+    """Jalankan query biasa (list) atau mode streaming (iterator batch)"""
+    if stream:
+        return stream_batches(query, batch_size=batch_size)
+    return fetch_all(query)
+
+# ============================
+# LISTEN/NOTIFY
+# ============================
+
+# Channel notifikasi perubahan data (trigger di Jet/ddd.sql)
+NOTIFY_CHANNEL = "dashboard_changes"
+
+def listen_notifications(channel=NOTIFY_CHANNEL, timeout=5.0):
+    """Generator payload NOTIFY dari channel, per kelompok yang datang bersamaan.
 
-# Membuat cursor
-c = conn.cursor()
+    Memakai koneksi khusus di luar pool (autocommit, hidup selama generator
+    dipakai). Setiap timeout detik tanpa notifikasi menghasilkan list kosong,
+    supaya pemanggil bisa berhenti atau melakukan pekerjaan lain.
+    """
+    conn = psycopg2.connect(**DB_CONFIG)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute(sql.SQL("LISTEN {}").format(sql.Identifier(channel)))
+        while True:
+            if select.select([conn], [], [], timeout) == ([], [], []):
+                yield []
+                continue
+            conn.poll()
+            payloads = [notify.payload for notify in conn.notifies]
+            conn.notifies.clear()
+            yield payloads
+    finally:
+        conn.close()
+
+# ============================
+# Query dasar
+# ============================
+
+CUSTOMERS_QUERY = '''
+    SELECT customer_id, name, email, phone, address, birthdate
+    FROM customers
+    ORDER BY name ASC
+'''
+
+ORDERS_WITH_CUSTOMERS_QUERY = '''
+    SELECT
+        o.order_id,
+        o.order_date,
+        o.total_amount,
+        c.name AS customer_name,
+        c.phone
+    FROM orders o
+    JOIN customers c ON o.customer_id = c.customer_id
+    ORDER BY o.order_date DESC
+'''
+
+PRODUCTS_QUERY = '''
+    SELECT product_id, name, description, price, stock
+    FROM products
+    ORDER BY name ASC
+'''
+
+# Join tabel order, dipakai ulang oleh query detail, filter dan export
+ORDER_DETAILS_FROM = '''
+    FROM order_details od
+    JOIN orders o ON od.order_id = o.order_id
+    JOIN customers c ON o.customer_id = c.customer_id
+    JOIN products p ON od.product_id = p.product_id
+'''
+
+# Join order_details tanpa ORDER BY, dipakai ulang oleh query lain (incremental, filter)
+ORDER_DETAILS_SELECT = '''
+    SELECT
+        od.order_detail_id,
+        o.order_id,
+        o.order_date,
+        c.customer_id,
+        c.name AS customer_name,
+        p.product_id,
+        p.name AS product_name,
+        p.price AS unit_price,
+        od.quantity,
+        od.subtotal,
+        o.total_amount AS order_total,
+        c.phone''' + ORDER_DETAILS_FROM
+
+ORDER_DETAILS_QUERY = ORDER_DETAILS_SELECT + '''
+    ORDER BY o.order_date DESC
+'''
+
+# Baris order_details yang lebih baru dari high-water mark (order_detail_id terakhir)
+ORDER_DETAILS_SINCE_QUERY = ORDER_DETAILS_SELECT + '''
+    WHERE od.order_detail_id > %(last_id)s OR od.order_detail_id = ANY(%(pending_ids)s)
+    ORDER BY od.order_detail_id ASC
+'''
+
+# Materialized view (dibuat di Jet/ddd.sql), agregasinya sudah dihitung di database
+DAILY_REVENUE_QUERY = '''
+    SELECT order_day, revenue, items, orders, lines
+    FROM mv_daily_revenue
+    ORDER BY order_day ASC
+'''
+
+PRODUCT_SALES_QUERY = '''
+    SELECT product_id, name, price, stock, total_terjual, total_pendapatan
+    FROM mv_product_sales
+    ORDER BY name ASC
+'''
+
+CUSTOMER_SPENDING_QUERY = '''
+    SELECT customer_id, name, orders, items, total_spending, last_order_date
+    FROM mv_customer_spending
+    ORDER BY total_spending DESC
+'''
+
+# Versi data per tabel: nilai sequence data_version_<tabel> yang dinaikkan
+# trigger di Jet/ddd.sql, ditambah jumlah baris yang pernah di-insert/update/
+# delete menurut statistik PostgreSQL. nextval sudah terlihat sebelum
+# transaksinya commit, sedangkan statistik baru naik (beberapa detik) setelah
+# transaksi selesai, jadi versi berubah lagi begitu datanya benar-benar
+# terlihat. Tanpa sequence (database lama) versi tetap berubah lewat
+# statistik saja.
+VERSIONED_TABLES = ('customers', 'products', 'orders', 'order_details')
+
+DATA_VERSIONS_QUERY = '''
+    SELECT t.table_name, s.last_value, st.n_tup_ins + st.n_tup_upd + st.n_tup_del
+    FROM unnest(%(tables)s::text[]) AS t(table_name)
+    LEFT JOIN pg_sequences s
+        ON s.schemaname = current_schema() AND s.sequencename = 'data_version_' || t.table_name
+    LEFT JOIN pg_stat_user_tables st
+        ON st.schemaname = current_schema() AND st.relname = t.table_name
+'''
 
 # ============================
 # Fungsi ambil data dari tabel
 # ============================
+# Default: list semua baris (fetchall).
+# stream=True: iterator batch baris lewat server-side cursor (memori tetap kecil).
+
+def view_customers(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(CUSTOMERS_QUERY, stream, batch_size)
+
+def view_orders_with_customers(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(ORDERS_WITH_CUSTOMERS_QUERY, stream, batch_size)
+
+def view_products(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(PRODUCTS_QUERY, stream, batch_size)
+
+def view_order_details_with_info(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(ORDER_DETAILS_QUERY, stream, batch_size)
+
+def view_daily_revenue(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(DAILY_REVENUE_QUERY, stream, batch_size)
+
+def view_product_sales(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(PRODUCT_SALES_QUERY, stream, batch_size)
+
+def view_customer_spending(stream=False, batch_size=STREAM_BATCH_SIZE):
+    return _run(CUSTOMER_SPENDING_QUERY, stream, batch_size)
+
+# ============================
+# Loader langsung ke DataFrame
+# ============================
+# Data dikirim PostgreSQL lewat COPY ... TO STDOUT lalu di-parse oleh pembaca
+# CSV pandas (C), jadi tidak ada tuple Python per baris dan tipe kolom
+# (datetime64, int32, categorical) sudah benar tanpa to_datetime/to_numeric lagi.
+
+def _copy_to_buffer(cur, query, params=None):
+    buf = io.BytesIO()
+    copy_sql = cur.mogrify(query, params).decode()
+    cur.copy_expert(f"COPY ({copy_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", buf)
+    buf.seek(0)
+    return buf
+
+def _read_copy(buf, dtypes, date_columns=()):
+    return pd.read_csv(buf, dtype=dtypes, parse_dates=list(date_columns), date_format='ISO8601')
+
+def query_to_dataframe(query, dtypes, date_columns=(), params=None):
+    """Jalankan query via COPY dan kembalikan DataFrame dengan tipe kolom yang sudah benar"""
+    for attempt in range(QUERY_RETRIES):
+        try:
+            with get_cursor() as cur:
+                buf = _copy_to_buffer(cur, query, params)
+            break
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt == QUERY_RETRIES - 1:
+                raise
+    return _read_copy(buf, dtypes, date_columns)
+
+def table_versions():
+    """Versi data tabel dashboard (customers, products, order_details) untuk kunci cache.
+
+    order_details dashboard adalah join dengan orders, customers dan products,
+    jadi versinya ikut berubah jika salah satu tabel itu berubah.
+    """
+    rows = fetch_all(DATA_VERSIONS_QUERY, {'tables': list(VERSIONED_TABLES)})
+    versions = {table_name: (sequence, changes) for table_name, sequence, changes in rows}
+    return {
+        'customers': versions['customers'],
+        'products': versions['products'],
+        'order_details': tuple(versions[name] for name in ('orders', 'order_details', 'customers', 'products')),
+    }
+
+def load_customers_df():
+    return query_to_dataframe(CUSTOMERS_QUERY, CUSTOMER_DTYPES, CUSTOMER_DATE_COLUMNS)
+
+def load_products_df():
+    return query_to_dataframe(PRODUCTS_QUERY, PRODUCT_DTYPES, PRODUCT_DATE_COLUMNS)
+
+def load_order_details_df():
+    return query_to_dataframe(ORDER_DETAILS_QUERY, ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS)
+
+def load_order_details_since_df(last_id, pending_ids=()):
+    """Baris order_details dengan order_detail_id > last_id, ditambah baris pending_ids
+    yang sudah terlihat (untuk export incremental dan live refresh)"""
+    return query_to_dataframe(ORDER_DETAILS_SINCE_QUERY, ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS,
+                              params={'last_id': last_id, 'pending_ids': [int(i) for i in pending_ids]})
+
+def pending_order_detail_ids(last_id, new_ids, pending_ids=(), window=PENDING_ID_WINDOW):
+    """Geser watermark order_detail_id setelah new_ids diambil, mengembalikan (last_id, pending_ids).
+
+    order_detail_id diambil dari sequence saat INSERT, tapi transaksinya bisa
+    commit belakangan, jadi id kecil bisa muncul sesudah id yang lebih besar
+    sudah terbaca. Id di bawah watermark yang belum terlihat (transaksi belum
+    commit, atau rollback) disimpan sebagai pending_ids dan ikut diambil lagi
+    oleh load_order_details_since_df. Hanya id dalam window terakhir yang
+    ditunggu, supaya celah dari rollback tidak menumpuk selamanya.
+    """
+    ids = pd.Index(new_ids, dtype='int64')
+    new_last = max(int(last_id), int(ids.max())) if len(ids) else int(last_id)
+    floor = new_last - window
+    seen = set(ids[ids > floor].tolist())
+    waiting = {int(i) for i in pending_ids if i > floor}
+    waiting.update(range(max(int(last_id), floor) + 1, new_last + 1))
+    return new_last, sorted(waiting - seen)
+
+def load_daily_revenue_df():
+    return query_to_dataframe(DAILY_REVENUE_QUERY, DAILY_REVENUE_DTYPES, DAILY_REVENUE_DATE_COLUMNS)
+
+def load_product_sales_df():
+    return query_to_dataframe(PRODUCT_SALES_QUERY, PRODUCT_SALES_DTYPES, PRODUCT_SALES_DATE_COLUMNS)
+
+def load_customer_spending_df():
+    return query_to_dataframe(CUSTOMER_SPENDING_QUERY, CUSTOMER_SPENDING_DTYPES, CUSTOMER_SPENDING_DATE_COLUMNS)
+
+# ============================
+# Refresh materialized view
+# ============================
+
+MATERIALIZED_VIEWS = ('mv_daily_revenue', 'mv_product_sales', 'mv_customer_spending')
+
+def refresh_materialized_views(views=MATERIALIZED_VIEWS, concurrently=True):
+    """Refresh materialized view satu per satu, masing-masing di transaksinya sendiri.
+
+    CONCURRENTLY membuat dashboard tetap bisa membaca isi lama selama refresh
+    (butuh UNIQUE INDEX, sudah ada di Jet/ddd.sql). Advisory lock mencegah dua
+    proses (misal dua dashboard) me-refresh view yang sama bersamaan; view
+    yang sedang di-refresh proses lain dilewati.
+    Mengembalikan daftar view yang berhasil di-refresh.
+    """
+    refreshed = []
+    for view in views:
+        if view not in MATERIALIZED_VIEWS:
+            raise ValueError(f"Materialized view tidak dikenal: {view!r}")
+        statement = sql.SQL("REFRESH MATERIALIZED VIEW {}{}").format(
+            sql.SQL("CONCURRENTLY " if concurrently else ""), sql.Identifier(view))
+        with get_cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_xact_lock(hashtext(%s))", (view,))
+            if not cur.fetchone()[0]:
+                continue
+            cur.execute(statement)
+        refreshed.append(view)
+    return refreshed
+
+def start_refresh_scheduler(interval=MV_REFRESH_INTERVAL, views=MATERIALIZED_VIEWS, concurrently=True):
+    """Refresh materialized view berkala di thread background.
+
+    Mengembalikan threading.Event, panggil .set() untuk menghentikan scheduler.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                refresh_materialized_views(views, concurrently)
+            except psycopg2.Error as e:
+                # Jangan matikan scheduler, coba lagi di interval berikutnya
+                print(f"Refresh materialized view gagal: {e}")
+
+    threading.Thread(target=loop, name="mv-refresh", daemon=True).start()
+    return stop
+
+# ============================
+# Query builder untuk filter dashboard
+# ============================
+# Filter sidebar dijadikan klausa WHERE berparameter, jadi hanya potongan data
+# yang cocok yang dikirim PostgreSQL ke dashboard.
+
+def _like_pattern(text):
+    """Pola ILIKE 'mengandung text', karakter %, _ dan \\ di text dicocokkan apa adanya"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+def _order_details_conditions(start_date=None, end_date=None, product_search=None,
+                              product_names=None, customer_names=None, customer_ids=None,
+                              max_detail_id=None):
+    conditions = []
+    params = {}
+    if start_date is not None:
+        conditions.append("o.order_date >= %(start_date)s")
+        params['start_date'] = pd.Timestamp(start_date).normalize().to_pydatetime()
+    if end_date is not None:
+        conditions.append("o.order_date < %(end_date)s")
+        params['end_date'] = (pd.Timestamp(end_date).normalize() + pd.Timedelta(days=1)).to_pydatetime()
+    if product_search:
+        conditions.append("p.name ILIKE %(product_search)s")
+        params['product_search'] = _like_pattern(product_search)
+    if product_names is not None:
+        conditions.append("p.name = ANY(%(product_names)s)")
+        params['product_names'] = list(product_names)
+    if customer_names is not None:
+        conditions.append("c.name = ANY(%(customer_names)s)")
+        params['customer_names'] = list(customer_names)
+    if customer_ids is not None:
+        conditions.append("c.customer_id = ANY(%(customer_ids)s)")
+        params['customer_ids'] = [int(i) for i in customer_ids]
+    if max_detail_id is not None:
+        # Batas high-water mark live refresh (baris setelahnya diambil terpisah)
+        conditions.append("od.order_detail_id <= %(max_detail_id)s")
+        params['max_detail_id'] = int(max_detail_id)
+    return conditions, params
+
+def _where(conditions):
+    if not conditions:
+        return ''
+    return "    WHERE " + "\n      AND ".join(conditions) + "\n"
+
+def order_details_filter(**filters):
+    """Susun klausa WHERE dan parameternya dari filter dashboard.
+
+    Rentang tanggal ditulis sebagai order_date >= awal AND < hari setelah akhir
+    (tanpa cast kolom ke date) supaya idx_orders_order_date terpakai. Nama
+    produk/customer yang dipilih dicocokkan persis lewat idx_products_name dan
+    idx_customers_name. Mengembalikan (where_sql, params), where_sql kosong
+    jika tidak ada filter.
+    """
+    conditions, params = _order_details_conditions(**filters)
+    return _where(conditions), params
+
+def build_order_details_query(order_by="o.order_date DESC", **filters):
+    """Query order_details (join lengkap) dengan filter dashboard, mengembalikan (query, params)"""
+    where, params = order_details_filter(**filters)
+    return f"{ORDER_DETAILS_SELECT}{where}    ORDER BY {order_by}\n", params
+
+def load_order_details_filtered_df(**filters):
+    """Baris order_details yang cocok dengan filter (lihat order_details_filter)"""
+    query, params = build_order_details_query(**filters)
+    return query_to_dataframe(query, ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS, params=params)
+
+# ============================
+# Agregat tabel order untuk chart dan metrik
+# ============================
+# Mode DB tidak memuat baris order ke dashboard: chart dan metrik dihitung
+# PostgreSQL dengan GROUP BY di atas filter yang sama (order_details_filter),
+# jadi yang dikirim hanya satu baris per hari / produk / customer / sel kalender.
+
+# group -> (kolom kunci di SELECT, ekspresi GROUP BY). Nama ikut lewat primary key.
+ORDER_TOTALS_GROUPS = {
+    'date': ("o.order_date::date AS date", "o.order_date::date"),
+    'product': ("p.product_id, p.name AS product_name", "p.product_id"),
+    'customer': ("c.customer_id, c.name AS customer_name", "c.customer_id"),
+}
+
+def build_order_totals_query(group, **filters):
+    """Total quantity, revenue, jumlah order dan baris per group ('date', 'product'
+    atau 'customer') untuk baris yang cocok dengan filter, mengembalikan (query, params)"""
+    keys, group_by = ORDER_TOTALS_GROUPS[group]
+    where, params = order_details_filter(**filters)
+    query = (f"    SELECT {keys}, SUM(od.quantity) AS quantity, SUM(od.subtotal) AS revenue,\n"
+             f"        COUNT(DISTINCT o.order_id) AS orders, COUNT(*) AS lines"
+             f"{ORDER_DETAILS_FROM}{where}"
+             f"    GROUP BY {group_by}\n"
+             f"    ORDER BY {group_by}\n")
+    return query, params
+
+def load_order_totals_df(group, **filters):
+    """Total per group untuk filter dashboard (lihat build_order_totals_query)"""
+    query, params = build_order_totals_query(group, **filters)
+    date_columns = ORDER_TOTALS_DATE_COLUMNS if group == 'date' else []
+    return query_to_dataframe(query, ORDER_TOTALS_DTYPES, date_columns, params=params)
+
+def load_order_totals_at_watermark(groups, window=PENDING_ID_WINDOW):
+    """Total per group (lihat build_order_totals_query) beserta watermark-nya.
+
+    Semua query berjalan di satu transaksi REPEATABLE READ, jadi total,
+    order_detail_id terbesar dan id yang belum terlihat berasal dari snapshot
+    yang sama. Mengembalikan (last_id, pending_ids, [DataFrame per group]).
+    """
+    for attempt in range(QUERY_RETRIES):
+        try:
+            with get_cursor() as cur:
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                cur.execute("SELECT COALESCE(MAX(order_detail_id), 0) FROM order_details")
+                max_id = cur.fetchone()[0]
+                cur.execute("SELECT order_detail_id FROM order_details WHERE order_detail_id > %s",
+                            (max_id - window,))
+                seen = [row[0] for row in cur.fetchall()]
+                bufs = [_copy_to_buffer(cur, *build_order_totals_query(group)) for group in groups]
+            break
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            if attempt == QUERY_RETRIES - 1:
+                raise
+    last_id, pending_ids = pending_order_detail_ids(max(max_id - window, 0), seen, window=window)
+    frames = [_read_copy(buf, ORDER_TOTALS_DTYPES, ORDER_TOTALS_DATE_COLUMNS if group == 'date' else [])
+              for group, buf in zip(groups, bufs)]
+    return last_id, pending_ids, frames
+
+def build_order_calendar_query(**filters):
+    """Total revenue dan jumlah baris per (bulan, hari, jam) order, mengembalikan (query, params).
+
+    Hari dihitung dari ISODOW (Senin = 0) seperti urutan DAY_ORDER di dashboard.
+    Order tanpa order_date tidak ikut.
+    """
+    conditions, params = _order_details_conditions(**filters)
+    conditions.append("o.order_date IS NOT NULL")
+    query = ("    SELECT EXTRACT(MONTH FROM o.order_date)::int AS month,\n"
+             "        EXTRACT(ISODOW FROM o.order_date)::int - 1 AS day,\n"
+             "        EXTRACT(HOUR FROM o.order_date)::int AS hour,\n"
+             "        SUM(od.subtotal) AS revenue, COUNT(*) AS lines"
+             f"{ORDER_DETAILS_FROM}{_where(conditions)}"
+             "    GROUP BY 1, 2, 3\n")
+    return query, params
+
+def load_order_calendar_df(**filters):
+    """Total per sel kalender untuk filter dashboard (lihat build_order_calendar_query)"""
+    query, params = build_order_calendar_query(**filters)
+    return query_to_dataframe(query, ORDER_CALENDAR_DTYPES, params=params)
+
+# Kolom tabel order yang bisa dipakai untuk keyset pagination -> ekspresi SQL.
+# Hanya order_date yang boleh NULL (orders.order_date nullable), lihat
+# ORDER_DETAILS_NULLABLE_COLUMNS.
+ORDER_DETAILS_SORT_COLUMNS = {
+    'order_detail_id': 'od.order_detail_id',
+    'order_id': 'o.order_id',
+    'order_date': 'o.order_date',
+    'customer_id': 'c.customer_id',
+    'customer_name': 'c.name',
+    'product_id': 'p.product_id',
+    'product_name': 'p.name',
+    'unit_price': 'p.price',
+    'quantity': 'od.quantity',
+    'subtotal': 'od.subtotal',
+    'order_total': 'o.total_amount',
+}
+
+# Kolom sort yang boleh NULL. NULL selalu di akhir (NULLS LAST, sama seperti
+# sort_values di mode file) dan tidak bisa dibandingkan lewat (kolom, id) > (nilai, id),
+# jadi cursor untuk kolom ini ditangani terpisah.
+ORDER_DETAILS_NULLABLE_COLUMNS = {'order_date'}
+
+def _order_details_order_by(sort_column, ascending):
+    # Urutan tabel order di layar: kolom sort (NULL di akhir), lalu order_detail_id
+    direction = 'ASC' if ascending else 'DESC'
+    return (f"    ORDER BY {ORDER_DETAILS_SORT_COLUMNS[sort_column]} {direction} NULLS LAST,"
+            f" od.order_detail_id {direction}\n")
+
+def build_order_details_page_query(sort_column='order_date', ascending=False, after=None,
+                                   page_size=50, **filters):
+    """Satu halaman order_details dengan keyset pagination, mengembalikan (query, params).
+
+    Urutan selalu (sort_column, order_detail_id) supaya stabil walau nilai
+    kolom sort kembar. after = (nilai sort_column, order_detail_id) dari baris
+    terakhir halaman sebelumnya (None untuk halaman pertama). Batas kolom sort
+    juga ditulis terpisah supaya index di kolom itu (misal idx_orders_order_date)
+    bisa dipakai untuk langsung melompat ke posisi halaman.
+
+    Nilai NULL selalu di akhir untuk kedua arah. Untuk kolom yang boleh NULL,
+    baris NULL tetap ikut setelah semua nilai non-NULL, dan cursor bernilai
+    NULL (None) melanjutkan di antara baris NULL menurut order_detail_id.
+    """
+    expr = ORDER_DETAILS_SORT_COLUMNS[sort_column]
+    op = '>' if ascending else '<'
+    nullable = sort_column in ORDER_DETAILS_NULLABLE_COLUMNS
+    conditions, params = _order_details_conditions(**filters)
+    if after is not None:
+        params['after_value'], params['after_id'] = after
+        if after[0] is None:
+            conditions.append(f"{expr} IS NULL")
+            conditions.append(f"od.order_detail_id {op} %(after_id)s")
+        elif nullable:
+            conditions.append(f"({expr} {op}= %(after_value)s OR {expr} IS NULL)")
+            conditions.append(f"(({expr}, od.order_detail_id) {op} (%(after_value)s, %(after_id)s)"
+                              f" OR {expr} IS NULL)")
+        else:
+            conditions.append(f"{expr} {op}= %(after_value)s")
+            conditions.append(f"({expr}, od.order_detail_id) {op} (%(after_value)s, %(after_id)s)")
+    params['page_size'] = page_size
+    query = (f"{ORDER_DETAILS_SELECT}{_where(conditions)}"
+             f"{_order_details_order_by(sort_column, ascending)}"
+             f"    LIMIT %(page_size)s\n")
+    return query, params
+
+def load_order_details_page_df(**kwargs):
+    """Satu halaman order_details (lihat build_order_details_page_query)"""
+    query, params = build_order_details_page_query(**kwargs)
+    return query_to_dataframe(query, ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS, params=params)
+
+# Kolom tabel order di dashboard -> ekspresi SQL untuk export, termasuk kolom
+# waktu turunan (sama dengan preprocess.prepare_order_details, nama bulan dan
+# hari dalam bahasa Inggris).
+ORDER_DETAILS_EXPORT_COLUMNS = {
+    **ORDER_DETAILS_SORT_COLUMNS,
+    'phone': 'c.phone',
+    'year': 'EXTRACT(YEAR FROM o.order_date)::int',
+    'month': 'EXTRACT(MONTH FROM o.order_date)::int',
+    'month_name': "to_char(o.order_date, 'FMMonth')",
+    'day_name': "to_char(o.order_date, 'FMDay')",
+    'hour': 'EXTRACT(HOUR FROM o.order_date)::int',
+}
+
+def build_order_details_export_query(columns, sort_column='order_date', ascending=False, **filters):
+    """Kolom terpilih dari tabel order untuk download, mengembalikan (query, params).
+
+    Urutannya sama dengan halaman keyset (build_order_details_page_query),
+    jadi file berisi baris yang sama seperti tabel di layar, tanpa
+    mengurutkan apa pun di dashboard.
+    """
+    select = ",\n".join(f"        {ORDER_DETAILS_EXPORT_COLUMNS[col]} AS {col}" for col in columns)
+    where, params = order_details_filter(**filters)
+    query = (f"    SELECT\n{select}{ORDER_DETAILS_FROM}{where}"
+             f"{_order_details_order_by(sort_column, ascending)}")
+    return query, params
+
+# ============================
+# Export massal lewat COPY
+# ============================
+
+def copy_query_to_file(query, path, params=None):
+    """Tulis hasil query sebagai CSV langsung ke file lewat COPY ... TO STDOUT.
 
-def view_customers():
-    query = '''
-        SELECT customer_id, name, email, phone, address, birthdate
-        FROM customers
-        ORDER BY name ASC
-    '''
-    c.execute(query)
-    return c.fetchall()
-
-def view_orders_with_customers():
-    query = '''
-        SELECT 
-            o.order_id, 
-            o.order_date, 
-            o.total_amount, 
-            c.name AS customer_name, 
-            c.phone 
-        FROM orders o
-        JOIN customers c ON o.customer_id = c.customer_id
-        ORDER BY o.order_date DESC
-    '''
-    c.execute(query)
-    return c.fetchall()
-
-def view_products():
-    query = '''
-        SELECT product_id, name, description, price, stock
-        FROM products
-        ORDER BY name ASC
-    '''
-    c.execute(query)
-    return c.fetchall()
-
-def view_order_details_with_info():
-    query = '''
-        SELECT 
-            od.order_detail_id,
-            o.order_id,
-            o.order_date,
-            c.customer_id,
-            c.name AS customer_name,
-            p.product_id,
-            p.name AS product_name,
-            p.price AS unit_price,
-            od.quantity,
-            od.subtotal,
-            o.total_amount AS order_total,
-            c.phone
-        FROM order_details od
-        JOIN orders o ON od.order_id = o.order_id
-        JOIN customers c ON o.customer_id = c.customer_id
-        JOIN products p ON od.product_id = p.product_id
-        ORDER BY o.order_date DESC
-    '''
-    c.execute(query)
-    return c.fetchall()
-
-
-    # Tutup koneksi
-    c.close()
-    conn.close()
\ No newline at end of file
+    Data ditulis per potongan saat diterima dari server, jadi memori tetap
+    konstan. File ditulis ke path sementara dulu lalu di-rename supaya file
+    lama tidak rusak jika export gagal di tengah jalan.
+    Mengembalikan jumlah baris yang ditulis.
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        with get_cursor() as cur:
+            copy_sql = cur.mogrify(query, params).decode()
+            with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+                cur.copy_expert(f"COPY ({copy_sql}) TO STDOUT WITH (FORMAT csv, HEADER true)", f)
+            rowcount = cur.rowcount
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return rowcount
@@ -0,0 +1,380 @@
+"""Penyimpanan data dashboard di disk (folder data/)
+
+Tabel customers dan products disimpan sebagai satu file (CSV atau Parquet).
+order_details bisa disimpan sebagai file CSV tunggal, atau sebagai store yang
+dipartisi per bulan order:
+
+    data/order_details/order_month=2025-01/part-000000000.parquet
+    data/order_details/order_month=2025-02/part-000000000.parquet
+    ...
+    data/order_details/order_month=unknown/...  # baris tanpa order_date
+    data/order_details_watermark.json   # high-water mark export incremental
+
+Setiap export incremental menulis file part baru yang diberi nama sesuai
+watermark saat export dimulai, jadi menjalankan ulang export yang gagal
+di tengah jalan akan menimpa file yang sama (tidak ada data dobel). Watermark
+juga mencatat id di bawahnya yang transaksinya belum commit saat export
+(pending_ids), baris itu ikut diambil oleh export berikutnya.
+
+Untuk dashboard, order_details juga disalin ke data/order_details.arrow
+(Arrow IPC tanpa kompresi) yang dibaca lewat memory map: semua sesi memakai
+halaman file yang sama dari page cache OS, tanpa salinan per sesi.
+
+Format Parquet dan Arrow butuh pyarrow. Tanpa pyarrow, data dibaca dari CSV.
+"""
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow opsional, tanpa pyarrow hanya format CSV yang dipakai
+    pa = ds = feather = None
+
+from schema import (
+    CUSTOMER_DTYPES, CUSTOMER_DATE_COLUMNS,
+    PRODUCT_DTYPES, PRODUCT_DATE_COLUMNS,
+    ORDER_DETAIL_COLUMNS, ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS,
+)
+
+DATA_DIR = 'data'
+ORDER_DETAILS_STORE = 'order_details'
+WATERMARK_FILE = 'order_details_watermark.json'
+ORDER_DETAILS_ARROW = 'order_details.arrow'
+STORE_FORMATS = ('csv', 'parquet')
+# Partisi untuk baris tanpa order_date (NULL di database)
+UNKNOWN_MONTH = 'unknown'
+
+# Sumber data dashboard: 'file' (folder data/) atau 'db' (tabel dibaca dan
+# filter sidebar dijalankan langsung di PostgreSQL lewat config.py)
+DATA_SOURCES = ('file', 'db')
+DATA_SOURCE = os.environ.get('DASHBOARD_DATA_SOURCE', 'file')
+
+def pyarrow_available():
+    return ds is not None
+
+def enable_copy_on_write():
+    """Aktifkan Copy-on-Write pandas (sudah default sejak pandas 3.0).
+
+    Dengan CoW, kolom turunan (assign, filter) berbagi memori dengan
+    DataFrame asal sampai benar-benar diubah, jadi tidak perlu .copy() penuh.
+    """
+    if int(pd.__version__.split('.')[0]) < 3:
+        pd.set_option('mode.copy_on_write', True)
+
+def _read_csv(path, dtypes, date_columns, columns=None):
+    if columns is not None:
+        dtypes = {c: t for c, t in dtypes.items() if c in columns}
+        date_columns = [c for c in date_columns if c in columns]
+    return pd.read_csv(path, usecols=columns, dtype=dtypes,
+                       parse_dates=list(date_columns), date_format='ISO8601')
+
+# ============================
+# High-water mark
+# ============================
+
+def read_watermark(data_dir=DATA_DIR):
+    """Baca watermark export terakhir, default mulai dari awal"""
+    path = os.path.join(data_dir, WATERMARK_FILE)
+    if not os.path.exists(path):
+        return {'order_detail_id': 0, 'order_date': None, 'pending_ids': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_watermark(watermark, data_dir=DATA_DIR):
+    """Simpan watermark secara atomik (tulis ke file sementara lalu rename)"""
+    path = os.path.join(data_dir, WATERMARK_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(watermark, f, indent=2)
+    os.replace(tmp_path, path)
+
+# ============================
+# Tabel dimensi (customers, products)
+# ============================
+
+def discard_table(name, fmt, data_dir=DATA_DIR):
+    """Hapus data/<name>.<fmt> jika ada (supaya file format lain yang sudah basi tidak terbaca)"""
+    path = os.path.join(data_dir, f"{name}.{fmt}")
+    if os.path.exists(path):
+        os.remove(path)
+
+def write_table(df, name, data_dir=DATA_DIR, fmt='csv'):
+    """Tulis satu tabel utuh ke data/<name>.csv atau data/<name>.parquet"""
+    if fmt == 'parquet':
+        df.to_parquet(os.path.join(data_dir, f"{name}.parquet"), index=False)
+        discard_table(name, 'csv', data_dir)
+    else:
+        df.to_csv(os.path.join(data_dir, f"{name}.csv"), index=False, float_format='%.2f')
+        discard_table(name, 'parquet', data_dir)
+
+def read_table(name, dtypes, date_columns, data_dir=DATA_DIR, columns=None):
+    """Baca tabel dari Parquet jika ada (dan pyarrow terpasang), jika tidak dari CSV"""
+    parquet_path = os.path.join(data_dir, f"{name}.parquet")
+    if pyarrow_available() and os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path, columns=columns)
+    return _read_csv(os.path.join(data_dir, f"{name}.csv"), dtypes, date_columns, columns)
+
+# ============================
+# Store order_details per bulan
+# ============================
+
+def _arrow_type(dtype):
+    if dtype == 'category':
+        # Lebar indeks dictionary tetap int32 di semua part: pandas memilih int8/int16
+        # sesuai jumlah kategori, dan part dengan lebar berbeda tidak bisa dibaca bersama
+        return pa.dictionary(pa.int32(), pa.string())
+    if dtype == 'str':
+        return pa.string()
+    return pa.from_numpy_dtype(dtype)
+
+def order_details_arrow_schema(partitioned=False):
+    """Skema Arrow tetap untuk file part Parquet order_details.
+
+    partitioned menambahkan kolom partisi order_month (untuk membaca store).
+    """
+    fields = [pa.field(col, _arrow_type(ORDER_DETAIL_DTYPES.get(col, 'datetime64[ns]')))
+              for col in ORDER_DETAIL_COLUMNS]
+    if partitioned:
+        fields.append(pa.field('order_month', pa.string()))
+    return pa.schema(fields)
+
+def order_month(order_dates):
+    """Kunci partisi 'YYYY-MM' dari kolom order_date, UNKNOWN_MONTH jika kosong"""
+    return order_dates.dt.strftime('%Y-%m').fillna(UNKNOWN_MONTH)
+
+def append_order_details(df, after_id, data_dir=DATA_DIR, fmt='csv'):
+    """Tambahkan baris baru ke store, satu file part per bulan order.
+
+    after_id adalah watermark order_detail_id saat export dimulai dan
+    dipakai sebagai nama file part. Baris tanpa order_date ikut ditulis ke
+    partisi UNKNOWN_MONTH (watermark sudah melewati baris tersebut, jadi
+    tidak boleh dibuang). Mengembalikan daftar file yang ditulis.
+    """
+    written = []
+    if df.empty:
+        return written
+    for month, part in df.groupby(order_month(df['order_date']), sort=True):
+        part_dir = os.path.join(data_dir, ORDER_DETAILS_STORE, f"order_month={month}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, f"part-{after_id:09d}.{fmt}")
+        part = part[ORDER_DETAIL_COLUMNS]
+        if fmt == 'parquet':
+            # Kolom categorical (nama customer/produk) ditulis sebagai dictionary encoding
+            part.to_parquet(path, index=False, schema=order_details_arrow_schema())
+        else:
+            part.to_csv(path, index=False, float_format='%.2f')
+        written.append(path)
+    return written
+
+def reset_order_details_store(data_dir=DATA_DIR):
+    """Hapus store dan watermark (dipakai sebelum export penuh ke store)"""
+    shutil.rmtree(os.path.join(data_dir, ORDER_DETAILS_STORE), ignore_errors=True)
+    watermark_path = os.path.join(data_dir, WATERMARK_FILE)
+    if os.path.exists(watermark_path):
+        os.remove(watermark_path)
+
+def order_details_store_exists(data_dir=DATA_DIR):
+    return os.path.isdir(os.path.join(data_dir, ORDER_DETAILS_STORE))
+
+def store_format(data_dir=DATA_DIR):
+    """Format file part di store ('csv' / 'parquet'), None jika store masih kosong"""
+    for fmt in STORE_FORMATS:
+        if _store_parts(data_dir, fmt):
+            return fmt
+    return None
+
+def _store_parts(data_dir, fmt, months=None):
+    pattern = os.path.join(data_dir, ORDER_DETAILS_STORE, 'order_month=*', f"part-*.{fmt}")
+    paths = sorted(glob.glob(pattern))
+    if months is not None:
+        wanted = {f"order_month={m}" for m in months}
+        paths = [p for p in paths if os.path.basename(os.path.dirname(p)) in wanted]
+    return paths
+
+def _fix_categories(df):
+    # Kategori tiap file part bisa berbeda, samakan lagi setelah digabung
+    for col, dtype in ORDER_DETAIL_DTYPES.items():
+        if dtype == 'category' and col in df.columns and df[col].dtype != 'category':
+            df[col] = df[col].astype('category')
+    return df
+
+def _empty_order_details(columns):
+    return pd.DataFrame({col: pd.Series(dtype=ORDER_DETAIL_DTYPES.get(col, 'datetime64[ns]'))
+                         for col in columns})
+
+def read_order_details_store(data_dir=DATA_DIR, months=None, columns=None,
+                             start_date=None, end_date=None):
+    """Baca store order_details.
+
+    months (list 'YYYY-MM', boleh berisi UNKNOWN_MONTH untuk baris tanpa
+    order_date) membatasi partisi yang dibaca, columns memilih kolom
+    (projection) dan start_date/end_date memfilter order_date (baris tanpa
+    order_date tidak ikut jika ada filter tanggal).
+    Untuk Parquet, filter tanggal diteruskan ke pyarrow (predicate pushdown)
+    sehingga partisi bulan di luar rentang tidak dibuka sama sekali.
+    """
+    columns = list(columns) if columns is not None else list(ORDER_DETAIL_COLUMNS)
+    start = pd.Timestamp(start_date) if start_date is not None else None
+    # end_date inklusif sampai akhir hari
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1) if end_date is not None else None
+
+    parquet_paths = _store_parts(data_dir, 'parquet', months) if pyarrow_available() else []
+    if parquet_paths:
+        # Skema eksplisit supaya part lama (lebar indeks dictionary berbeda) tetap bisa digabung
+        dataset = ds.dataset(parquet_paths, format='parquet', partitioning='hive',
+                             partition_base_dir=os.path.join(data_dir, ORDER_DETAILS_STORE),
+                             schema=order_details_arrow_schema(partitioned=True))
+        expr = None
+        if start is not None:
+            expr = (ds.field('order_month') >= start.strftime('%Y-%m')) & (ds.field('order_date') >= start)
+        if end is not None:
+            end_expr = (ds.field('order_month') <= end.strftime('%Y-%m')) & (ds.field('order_date') < end)
+            expr = end_expr if expr is None else expr & end_expr
+        return _fix_categories(dataset.to_table(columns=columns, filter=expr).to_pandas())
+
+    csv_paths = _store_parts(data_dir, 'csv', months)
+    if not csv_paths:
+        return _empty_order_details(columns)
+    read_cols = columns if 'order_date' in columns or (start is None and end is None) else columns + ['order_date']
+    df = pd.concat(
+        [_read_csv(p, ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS, read_cols) for p in csv_paths],
+        ignore_index=True
+    )
+    if start is not None:
+        df = df[df['order_date'] >= start]
+    if end is not None:
+        df = df[df['order_date'] < end]
+    return _fix_categories(df[columns].reset_index(drop=True))
+
+def read_order_details(data_dir=DATA_DIR, columns=None, start_date=None, end_date=None):
+    """Baca order_details dari store per bulan jika ada, jika tidak dari order_details.csv"""
+    if order_details_store_exists(data_dir):
+        return read_order_details_store(data_dir, columns=columns,
+                                        start_date=start_date, end_date=end_date)
+    df = _read_csv(os.path.join(data_dir, 'order_details.csv'),
+                   ORDER_DETAIL_DTYPES, ORDER_DETAIL_DATE_COLUMNS, columns)
+    if start_date is not None:
+        df = df[df['order_date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['order_date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    return df
+
+# ============================
+# Arrow IPC (memory-mapped)
+# ============================
+
+def _order_details_sources(data_dir):
+    if order_details_store_exists(data_dir):
+        return _store_parts(data_dir, 'parquet') + _store_parts(data_dir, 'csv')
+    return [p for p in [os.path.join(data_dir, 'order_details.csv')] if os.path.exists(p)]
+
+def build_order_details_arrow(data_dir=DATA_DIR, force=False):
+    """Tulis ulang data/order_details.arrow jika belum ada atau lebih lama dari sumbernya"""
+    path = os.path.join(data_dir, ORDER_DETAILS_ARROW)
+    sources = _order_details_sources(data_dir)
+    if not sources:
+        raise FileNotFoundError(f"Data order_details tidak ditemukan di '{data_dir}'")
+    newest = max(os.path.getmtime(p) for p in sources)
+    if not force and os.path.exists(path) and os.path.getmtime(path) >= newest:
+        return path
+    # Tanpa kompresi supaya bisa di-memory-map; rename atomik supaya proses lain
+    # yang sedang memakai file lama tidak terganggu. Nama file sementara unik
+    # per pemanggilan (bukan per proses) karena beberapa sesi Streamlit di
+    # proses yang sama bisa membangun ulang file ini bersamaan.
+    fd, tmp_path = tempfile.mkstemp(dir=data_dir, prefix=f"{ORDER_DETAILS_ARROW}.", suffix='.tmp')
+    os.close(fd)
+    try:
+        feather.write_feather(read_order_details(data_dir), tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+def load_order_details_mmap(data_dir=DATA_DIR, columns=None):
+    """order_details dari file Arrow yang di-memory-map.
+
+    Kolom angka dan tanggal langsung menunjuk ke memori file (zero-copy,
+    read-only), jadi hasilnya harus diperlakukan sebagai data baca-saja.
+    columns memilih kolom (kolom lain tidak pernah disentuh).
+    Tanpa pyarrow atau jika folder data tidak bisa ditulis, dibaca biasa.
+    """
+    if not pyarrow_available():
+        return read_order_details(data_dir, columns=columns)
+    try:
+        path = build_order_details_arrow(data_dir)
+    except OSError:
+        return read_order_details(data_dir, columns=columns)
+    table = feather.read_table(path, columns=list(columns) if columns is not None else None, memory_map=True)
+    return _fix_categories(table.to_pandas(split_blocks=True))
+
+def load_order_details(data_dir=DATA_DIR, columns=None, start_date=None, end_date=None):
+    """order_details untuk dashboard, hanya kolom dan rentang order_date yang diminta.
+
+    Jika ada store per bulan, filter tanggal diteruskan ke read_order_details
+    (hanya partisi bulan dalam rentang yang dibaca). Jika tidak, dipotong dari
+    file Arrow yang di-memory-map.
+    """
+    if (start_date is not None or end_date is not None) and order_details_store_exists(data_dir):
+        return read_order_details(data_dir, columns, start_date, end_date)
+    read_cols = columns
+    if columns is not None and 'order_date' not in columns and (start_date is not None or end_date is not None):
+        read_cols = list(columns) + ['order_date']
+    df = load_order_details_mmap(data_dir, read_cols)
+    if start_date is not None:
+        df = df[df['order_date'] >= pd.Timestamp(start_date)]
+    if end_date is not None:
+        df = df[df['order_date'] < pd.Timestamp(end_date) + pd.Timedelta(days=1)]
+    return df if read_cols is columns else df[list(columns)]
+
+# ============================
+# Loader untuk dashboard
+# ============================
+
+def read_customers(data_dir=DATA_DIR):
+    return read_table('customers', CUSTOMER_DTYPES, CUSTOMER_DATE_COLUMNS, data_dir)
+
+def read_products(data_dir=DATA_DIR):
+    return read_table('products', PRODUCT_DTYPES, PRODUCT_DATE_COLUMNS, data_dir)
+
+def _table_sources(name, data_dir):
+    if name == 'order_details':
+        return _order_details_sources(data_dir)
+    paths = [os.path.join(data_dir, f"{name}.{fmt}") for fmt in ('parquet', 'csv')]
+    return [p for p in paths if os.path.exists(p)]
+
+_file_hashes = {}  # path -> (mtime_ns, size, sha1 isi file)
+
+def _file_hash(path):
+    """sha1 isi file, dihitung ulang hanya jika mtime/ukuran file berubah"""
+    stat = os.stat(path)
+    cached = _file_hashes.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    _file_hashes[path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+    return _file_hashes[path][2]
+
+def table_version(name, data_dir=DATA_DIR):
+    """Versi data satu tabel dari isi file sumbernya.
+
+    Hash isi file hanya dihitung ulang jika mtime/ukuran file berubah, jadi
+    biasanya cukup os.stat dan bisa dipanggil setiap rerun sebagai kunci
+    cache. Export ulang dengan isi yang sama menghasilkan versi yang sama,
+    jadi cache tidak dihitung ulang.
+    """
+    sources = _table_sources(name, data_dir)
+    if not sources:
+        raise FileNotFoundError(f"Data {name} tidak ditemukan di '{data_dir}'")
+    return tuple((os.path.basename(p), _file_hash(p)) for p in sources)
@@ -0,0 +1,308 @@
+"""Export tabel dashboard ke file untuk tombol download
+
+File ditulis bertahap (per potongan CHUNK_ROWS baris) langsung ke disk, jadi
+tidak pernah ada salinan penuh hasil export sebagai string lalu bytes di
+memori. Format: CSV, CSV terkompresi gzip, atau Parquet (butuh pyarrow).
+
+Nama file diturunkan dari key (tabel, versi data, filter, urutan, kolom)
+dan format, jadi rerun dan sesi lain dengan filter yang sama langsung
+memakai file yang sudah ada. File lama dibuang jika jumlahnya melebihi
+MAX_CACHED_FILES.
+
+Sumber export bisa DataFrame atau hasil query database (query_source): di
+mode DB tabel order ditulis PostgreSQL sendiri lewat COPY, tanpa memuat
+barisnya ke dashboard.
+
+Export besar (BACKGROUND_MIN_ROWS baris ke atas) dijalankan sebagai job di
+thread pool (submit_export), jadi script Streamlit tidak tertahan selama
+file ditulis. Progres dan hasil job dibaca lewat export_status; job yang
+sama (key + format) hanya dijalankan sekali walau diminta banyak sesi.
+
+download_widget adalah tombol download yang dipakai kedua dashboard.
+"""
+import glob
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import streamlit as st
+
+import data_store
+from schema import ORDER_DETAIL_EXPORT_DTYPES, ORDER_DETAIL_DATE_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow opsional, tanpa pyarrow hanya CSV
+    pa = pq = None
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), 'dashboard_exports')
+CHUNK_ROWS = 50_000
+MAX_CACHED_FILES = 64
+# File yang dipakai dalam beberapa detik terakhir tidak dibuang, supaya sesi
+# yang baru saja menerima path-nya dari export_status masih sempat membukanya
+PRUNE_MIN_AGE = 120
+
+# Jumlah export background yang berjalan bersamaan
+EXPORT_WORKERS = int(os.environ.get('DASHBOARD_EXPORT_WORKERS', 2))
+# Export lebih kecil dari ini langsung ditulis saat halaman dirender
+BACKGROUND_MIN_ROWS = int(os.environ.get('DASHBOARD_EXPORT_BACKGROUND_ROWS', 100_000))
+
+_executor = None
+_jobs = {}  # path file hasil -> job yang sedang berjalan / gagal
+_jobs_lock = threading.Lock()
+
+# format -> (label, ekstensi file, mime type)
+FORMATS = {
+    'csv': ('CSV', '.csv', 'text/csv'),
+    'csv.gz': ('CSV (gzip)', '.csv.gz', 'application/gzip'),
+    'parquet': ('Parquet', '.parquet', 'application/vnd.apache.parquet'),
+}
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt != 'parquet' or data_store.pyarrow_available()]
+
+def format_label(fmt):
+    return FORMATS[fmt][0]
+
+def file_name(base_name, fmt):
+    return base_name + FORMATS[fmt][1]
+
+def mime_type(fmt):
+    return FORMATS[fmt][2]
+
+def export_path(key, fmt, export_dir=EXPORT_DIR):
+    digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+    return os.path.join(export_dir, digest + FORMATS[fmt][1])
+
+def query_source(copy_csv, rows, dtypes=None, date_columns=()):
+    """Sumber export dari query database: copy_csv(path) menulis hasil query sebagai CSV.
+
+    rows = jumlah baris hasil query (untuk memilih export background dan
+    progres), dtypes/date_columns = tipe kolom saat CSV dibaca ulang untuk Parquet.
+    """
+    return {'copy_csv': copy_csv, 'rows': rows, 'dtypes': dtypes, 'date_columns': list(date_columns)}
+
+def order_details_source(filters, sort_column, ascending, columns, rows):
+    """Mode DB: sumber download tabel order, ditulis PostgreSQL (COPY) dengan urutan tabel di layar"""
+    import config  # psycopg2 hanya dibutuhkan di mode DB
+    query, params = config.build_order_details_export_query(columns, sort_column, ascending, **filters)
+    return query_source(
+        lambda path: config.copy_query_to_file(query, path, params), rows,
+        ORDER_DETAIL_EXPORT_DTYPES, ORDER_DETAIL_DATE_COLUMNS
+    )
+
+def source_rows(source):
+    """Jumlah baris sumber export (DataFrame atau query_source)"""
+    return source['rows'] if isinstance(source, dict) else len(source)
+
+def _csv_to_parquet(csv_path, path, dtypes, date_columns, progress):
+    # CSV dibaca per potongan dengan tipe kolom tetap, jadi skema sama di semua potongan
+    header = pd.read_csv(csv_path, nrows=0).columns
+    dates = [col for col in date_columns if col in header]
+    options = dict(dtype=dtypes, parse_dates=dates, date_format='ISO8601')
+    empty = pd.read_csv(csv_path, nrows=0, **options).astype({col: 'datetime64[ns]' for col in dates})
+    schema = pa.Schema.from_pandas(empty, preserve_index=False)
+    with pq.ParquetWriter(path, schema) as writer:
+        rows = 0
+        for chunk in pd.read_csv(csv_path, chunksize=CHUNK_ROWS, **options):
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+            rows += len(chunk)
+            if progress:
+                progress(rows)
+
+def _write_query_export(source, path, fmt, progress):
+    if fmt == 'csv':
+        source['copy_csv'](path)
+    else:
+        # CSV dari COPY dulu, lalu dikompresi / dikonversi per potongan
+        csv_path = f"{path}.csv.tmp"
+        try:
+            source['copy_csv'](csv_path)
+            if fmt == 'csv.gz':
+                with open(csv_path, 'rb') as src, gzip.open(path, 'wb') as dst:
+                    shutil.copyfileobj(src, dst)
+            else:
+                _csv_to_parquet(csv_path, path, source['dtypes'], source['date_columns'], progress)
+        finally:
+            if os.path.exists(csv_path):
+                os.remove(csv_path)
+    if progress:
+        progress(source['rows'])
+
+def write_export(df, path, fmt='csv', progress=None):
+    """Tulis df (DataFrame atau query_source) ke path per potongan baris,
+    progress(jumlah_baris_tertulis) dipanggil setiap potongan"""
+    if isinstance(df, dict):
+        _write_query_export(df, path, fmt, progress)
+        return
+    if fmt == 'parquet':
+        schema = pa.Schema.from_pandas(df, preserve_index=False)
+        with pq.ParquetWriter(path, schema) as writer:
+            for start in range(0, len(df), CHUNK_ROWS):
+                chunk = df.iloc[start:start + CHUNK_ROWS]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+                if progress:
+                    progress(start + len(chunk))
+        return
+
+    opener = gzip.open if fmt == 'csv.gz' else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        # Minimal satu putaran supaya header tetap ditulis untuk tabel kosong
+        for start in range(0, max(len(df), 1), CHUNK_ROWS):
+            chunk = df.iloc[start:start + CHUNK_ROWS]
+            chunk.to_csv(f, index=False, header=start == 0)
+            if progress:
+                progress(start + len(chunk))
+
+def _prune(export_dir):
+    # File .tmp milik export yang sedang berjalan tidak ikut dihitung
+    files = [path for path in glob.glob(os.path.join(export_dir, '*.*')) if not path.endswith('.tmp')]
+    try:
+        files.sort(key=os.path.getmtime)
+        cutoff = time.time() - PRUNE_MIN_AGE
+        for path in files[:-MAX_CACHED_FILES]:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+    except OSError:
+        pass  # file sedang dibuang oleh proses lain, coba lagi di export berikutnya
+
+def export_file(df, key, fmt='csv', export_dir=EXPORT_DIR, progress=None):
+    """Path file export untuk df, ditulis hanya jika belum ada untuk key dan format ini"""
+    path = export_path(key, fmt, export_dir)
+    if os.path.exists(path):
+        os.utime(path)  # tandai baru dipakai supaya tidak ikut dibuang
+        return path
+    os.makedirs(export_dir, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write_export(df, tmp_path, fmt, progress)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _prune(export_dir)
+    return path
+
+# ============================
+# Export di background
+# ============================
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix='export')
+    return _executor
+
+def _finish(path, future):
+    # Job sukses cukup ditandai oleh file hasilnya, job gagal disimpan untuk pesan error
+    if future.exception() is None:
+        with _jobs_lock:
+            _jobs.pop(path, None)
+
+def submit_export(df, key, fmt='csv', export_dir=EXPORT_DIR):
+    """Mulai export df di background, kecuali file sudah ada atau job yang sama sedang berjalan"""
+    path = export_path(key, fmt, export_dir)
+    with _jobs_lock:
+        job = _jobs.get(path)
+        if os.path.exists(path) or (job is not None and not job['future'].done()):
+            return
+        job = {'rows': 0, 'total': source_rows(df)}
+
+        def progress(rows):
+            job['rows'] = rows
+
+        job['future'] = _get_executor().submit(export_file, df, key, fmt, export_dir, progress)
+        _jobs[path] = job
+    job['future'].add_done_callback(lambda future: _finish(path, future))
+
+def export_status(key, fmt='csv', export_dir=EXPORT_DIR):
+    """Status export untuk key dan format ini:
+
+    ('done', path), ('running', fraksi progres 0..1), ('error', exception)
+    atau ('missing', None) jika belum pernah diminta.
+    """
+    path = export_path(key, fmt, export_dir)
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # tandai baru dipakai supaya tidak dibuang sebelum sempat dibuka
+            return 'done', path
+        except FileNotFoundError:
+            pass  # baru saja dibuang _prune, anggap belum ada
+    with _jobs_lock:
+        job = _jobs.get(path)
+    if job is None:
+        return 'missing', None
+    if not job['future'].done():
+        return 'running', min(job['rows'] / job['total'], 1.0) if job['total'] else 0.0
+    error = job['future'].exception()
+    if error is not None:
+        return 'error', error
+    return 'done', job['future'].result()
+
+# ============================
+# Widget Streamlit
+# ============================
+
+# Teks widget per bahasa: 'id' untuk dashboard utama, 'en' untuk dashboard Jet
+TEXTS = {
+    'id': {
+        'format': "Format file",
+        'running': "Menyiapkan file {fmt}... {progress:.0%}",
+        'error': "⚠️ Export gagal: {error}",
+        'prepare': "📦 Siapkan file {fmt} ({rows:,} baris)",
+    },
+    'en': {
+        'format': "File format",
+        'running': "Preparing {fmt} file... {progress:.0%}",
+        'error': "⚠️ Export failed: {error}",
+        'prepare': "📦 Prepare {fmt} file ({rows:,} rows)",
+    },
+}
+
+def download_widget(df, label, base_name, key, cache_key, lang='id'):
+    """Pilihan format + tombol download untuk df (DataFrame atau query_source).
+    File ditulis bertahap ke disk dan dipakai ulang untuk cache_key (tabel,
+    versi data, filter, urutan, kolom) yang sama.
+    Export besar disiapkan di background dengan progress bar."""
+    text = TEXTS[lang]
+    fmt = st.selectbox(text['format'], available_formats(), format_func=format_label,
+                       key=f"{key}_download_format")
+    status, result = export_status(cache_key, fmt)
+    if status == 'missing' and source_rows(df) < BACKGROUND_MIN_ROWS:
+        status, result = 'done', export_file(df, cache_key, fmt)
+
+    if status == 'done':
+        try:
+            with open(result, 'rb') as f:
+                st.download_button(
+                    label=f"{label} ({format_label(fmt)})",
+                    data=f,
+                    file_name=file_name(base_name, fmt),
+                    mime=mime_type(fmt),
+                    key=f"{key}_download"
+                )
+            return
+        except FileNotFoundError:
+            # File dibuang proses lain sejak export_status: siapkan ulang di background
+            submit_export(df, cache_key, fmt)
+            status, result = 'running', 0.0
+
+    if status == 'running':
+        st.progress(result, text=text['running'].format(fmt=format_label(fmt), progress=result))
+        # Halaman dirender ulang otomatis sampai file siap (lihat akhir script dashboard)
+        st.session_state['export_running'] = True
+    else:
+        if status == 'error':
+            st.error(text['error'].format(error=result))
+        st.button(
+            text['prepare'].format(fmt=format_label(fmt), rows=source_rows(df)),
+            key=f"{key}_download_prepare",
+            on_click=submit_export, args=(df, cache_key, fmt)
+        )
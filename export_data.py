@@ -1,34 +1,155 @@
-"""Script untuk export data dari database ke CSV"""
+"""Script untuk export data dari database ke CSV / Parquet
+
+Cara pakai:
+    python export_data.py                    # export biasa lewat pandas
+    python export_data.py --format parquet   # Parquet, order_details dipartisi per bulan order
+    python export_data.py --copy             # COPY ... TO STDOUT langsung ke file (paralel)
+    python export_data.py --copy --workers 1 # COPY satu per satu
+    python export_data.py --incremental      # order_details: hanya baris baru sejak export terakhir
+"""
 from config import *
-import pandas as pd
+import argparse
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import data_store
+
+DATA_DIR = 'data'
+
+# (label, query, nama file) untuk setiap hasil export
+EXPORT_TARGETS = [
+    ("Customers", CUSTOMERS_QUERY, 'customers.csv'),
+    ("Products", PRODUCTS_QUERY, 'products.csv'),
+    ("Order Details", ORDER_DETAILS_QUERY, 'order_details.csv'),
+]
+
+def max_order_date(order_dates, previous=None):
+    """order_date terbesar (ISO) untuk watermark, None jika semua kosong.
+
+    order_date bisa mundur (order lama yang baru diinput), jadi nilai
+    watermark sebelumnya tetap dipakai jika lebih besar.
+    """
+    latest = order_dates.max()
+    latest = None if pd.isna(latest) else latest.isoformat()
+    if previous in (None, 'NaT'):  # 'NaT' dari watermark lama yang tersimpan salah
+        return latest
+    return previous if latest is None or previous > latest else latest
+
+def export_pandas(fmt='csv'):
+    """Export lewat DataFrame (seluruh tabel dimuat ke memori dulu)"""
+    # Export customers
+    df_customers = load_customers_df()
+    data_store.write_table(df_customers, 'customers', DATA_DIR, fmt)
+    print(f"✓ Customers: {len(df_customers)} records exported")
+
+    # Export products
+    df_products = load_products_df()
+    data_store.write_table(df_products, 'products', DATA_DIR, fmt)
+    print(f"✓ Products: {len(df_products)} records exported")
+
+    # Export order details
+    df_order_details = load_order_details_df()
+    data_store.reset_order_details_store(DATA_DIR)
+    if fmt == 'parquet':
+        # Store per bulan order, lanjutannya bisa diisi dengan --incremental
+        data_store.append_order_details(df_order_details, after_id=0, data_dir=DATA_DIR, fmt=fmt)
+        if not df_order_details.empty:
+            last_id, pending_ids = pending_order_detail_ids(0, df_order_details['order_detail_id'])
+            data_store.write_watermark({
+                'order_detail_id': last_id,
+                'order_date': max_order_date(df_order_details['order_date']),
+                'pending_ids': pending_ids,
+            }, DATA_DIR)
+    else:
+        df_order_details.to_csv(os.path.join(DATA_DIR, 'order_details.csv'), index=False, float_format='%.2f')
+    print(f"✓ Order Details: {len(df_order_details)} records exported")
+
+def export_copy(workers=len(EXPORT_TARGETS)):
+    """Export lewat COPY, setiap tabel memakai koneksinya sendiri dan berjalan paralel"""
+    # order_details.csv penuh menggantikan store per bulan, supaya dashboard tidak membaca data lama
+    data_store.reset_order_details_store(DATA_DIR)
+    for name in ('customers', 'products'):
+        data_store.discard_table(name, 'parquet', DATA_DIR)
+
+    def run(target):
+        label, query, filename = target
+        rows = copy_query_to_file(query, os.path.join(DATA_DIR, filename))
+        print(f"✓ {label}: {rows} records exported")
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        # list() supaya error dari thread mana pun ikut dilempar
+        list(executor.map(run, EXPORT_TARGETS))
+
+def export_incremental(fmt='csv'):
+    """Export customers/products penuh, order_details hanya baris baru sejak watermark"""
+    existing = data_store.store_format(DATA_DIR)
+    if existing is not None and existing != fmt:
+        raise SystemExit(f"Store order_details sudah berformat {existing}, "
+                         f"jalankan export penuh dulu untuk pindah ke {fmt}.")
+
+    # Tabel dimensi kecil, cukup ditulis ulang setiap kali
+    if fmt == 'parquet':
+        data_store.write_table(load_customers_df(), 'customers', DATA_DIR, fmt)
+        data_store.write_table(load_products_df(), 'products', DATA_DIR, fmt)
+        print("✓ Customers & Products exported")
+    else:
+        for label, query, filename in EXPORT_TARGETS:
+            if query is ORDER_DETAILS_QUERY:
+                continue
+            rows = copy_query_to_file(query, os.path.join(DATA_DIR, filename))
+            data_store.discard_table(filename.rsplit('.', 1)[0], 'parquet', DATA_DIR)
+            print(f"✓ {label}: {rows} records exported")
+
+    watermark = data_store.read_watermark(DATA_DIR)
+    last_id = watermark['order_detail_id']
+    # Id di bawah watermark yang belum commit saat export sebelumnya ikut diambil lagi
+    pending_ids = watermark.get('pending_ids', [])
+    df_new = load_order_details_since_df(last_id, pending_ids)
+    if df_new.empty:
+        print(f"✓ Order Details: tidak ada data baru (watermark order_detail_id={last_id})")
+        return
+
+    written = data_store.append_order_details(df_new, after_id=last_id, data_dir=DATA_DIR, fmt=fmt)
+    new_last_id, pending_ids = pending_order_detail_ids(last_id, df_new['order_detail_id'], pending_ids)
+    data_store.write_watermark({
+        'order_detail_id': new_last_id,
+        'order_date': max_order_date(df_new['order_date'], watermark['order_date']),
+        'pending_ids': pending_ids,
+    }, DATA_DIR)
+    print(f"✓ Order Details: {len(df_new)} records baru ditambahkan ke {len(written)} partisi bulan")
+
+def main():
+    parser = argparse.ArgumentParser(description="Export data dari database ke folder data/")
+    parser.add_argument('--copy', action='store_true',
+                        help="pakai COPY ... TO STDOUT, ditulis langsung ke file dengan memori konstan")
+    parser.add_argument('--workers', type=int, default=len(EXPORT_TARGETS),
+                        help="jumlah export yang berjalan paralel untuk mode --copy")
+    parser.add_argument('--incremental', action='store_true',
+                        help="order_details hanya baris baru, disimpan per bulan di data/order_details/")
+    parser.add_argument('--format', choices=data_store.STORE_FORMATS, default='csv',
+                        help="format file hasil export (parquet butuh pyarrow)")
+    args = parser.parse_args()
+
+    if args.format == 'parquet' and not data_store.pyarrow_available():
+        parser.error("format parquet butuh pyarrow (pip install pyarrow)")
+    if args.copy and args.format != 'csv':
+        parser.error("mode --copy hanya mendukung format csv")
+
+    # Buat folder data jika belum ada
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    print("Mengekspor data dari database...")
+
+    if args.incremental:
+        export_incremental(fmt=args.format)
+    elif args.copy:
+        export_copy(workers=args.workers)
+    else:
+        export_pandas(fmt=args.format)
+
+    print(f"\n✅ Semua data berhasil di-export ke folder '{DATA_DIR}/'!")
 
-# Buat folder data jika belum ada
-os.makedirs('data', exist_ok=True)
-
-print("Mengekspor data dari database...")
-
-# Export customers
-df_customers = pd.DataFrame(view_customers(), columns=[
-    'customer_id', 'name', 'email', 'phone', 'address', 'birthdate'
-])
-df_customers.to_csv('data/customers.csv', index=False)
-print(f"✓ Customers: {len(df_customers)} records exported")
-
-# Export products
-df_products = pd.DataFrame(view_products(), columns=[
-    'product_id', 'name', 'description', 'price', 'stock'
-])
-df_products.to_csv('data/products.csv', index=False)
-print(f"✓ Products: {len(df_products)} records exported")
-
-# Export order details
-df_order_details = pd.DataFrame(view_order_details_with_info(), columns=[
-    'order_detail_id', 'order_id', 'order_date', 'customer_id', 'customer_name',
-    'product_id', 'product_name', 'unit_price', 'quantity', 'subtotal',
-    'order_total', 'phone'
-])
-df_order_details.to_csv('data/order_details.csv', index=False)
-print(f"✓ Order Details: {len(df_order_details)} records exported")
-
-print("\n✅ Semua data berhasil di-export ke folder 'data/'!")
+if __name__ == '__main__':
+    main()
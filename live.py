@@ -0,0 +1,122 @@
+"""Live refresh cube order di mode DB lewat LISTEN/NOTIFY
+
+Dashboard tidak memegang baris order, hanya cube dari total yang dihitung
+PostgreSQL (rollups.cubes_from_totals). Cube dimuat sekali, lalu thread
+listener menunggu notifikasi dari trigger di Jet/ddd.sql (channel
+dashboard_changes):
+
+- order_details:INSERT -> hanya baris dengan order_detail_id > id terakhir
+  yang diambil, ditambah id lebih kecil yang tadinya belum terlihat karena
+  transaksinya commit belakangan (config.pending_order_detail_ids). Total
+  per produk ditambah baris baru itu saja; total harian
+  dan per customer diambil ulang dari database hanya untuk hari dan customer
+  yang kedatangan baris baru. Biayanya sebanding dengan baris baru, bukan
+  dengan seluruh tabel order.
+- orders:INSERT        -> diabaikan, order baru muncul bersama detailnya.
+- perubahan lain (UPDATE/DELETE/TRUNCATE, customers/products yang namanya
+  ikut di-join) -> semua total dihitung ulang di database.
+
+Tidak ada polling: database hanya ditanya saat ada notifikasi. Sesi
+dashboard membaca cube terbaru lewat snapshot() di setiap rerun, bersama
+versi cube itu sendiri. Versi data dari database (config.table_versions)
+bisa tertinggal atau mendahului cube di memori, jadi semua yang dihitung
+dari cube di-cache dengan versi snapshot.
+Jika koneksi listener putus, listener menyambung ulang lalu menghitung ulang
+semua total (notifikasi selama putus hilang, termasuk UPDATE/DELETE).
+"""
+import os
+import threading
+import time
+
+import rollups
+
+# Live refresh aktif di mode DB kecuali DASHBOARD_LIVE_REFRESH=0
+ENABLED = os.environ.get('DASHBOARD_LIVE_REFRESH', '1') != '0'
+
+# Jeda sebelum menyambung ulang listener yang putus (detik)
+RECONNECT_DELAY = 5.0
+
+def _config():
+    import config  # psycopg2 hanya dibutuhkan di mode DB
+    return config
+
+def _reload(state):
+    config = _config()
+    # Total dan watermark dari satu snapshot, baris sesudahnya masuk lewat _apply_new_rows
+    last_id, pending_ids, totals = config.load_order_totals_at_watermark(rollups.TOTALS_GROUPS)
+    cubes = rollups.cubes_from_totals(*totals)
+    with state['lock']:
+        state['cubes'], state['last_id'], state['pending_ids'] = cubes, last_id, pending_ids
+        state['generation'] += 1
+
+def _apply_new_rows(state):
+    """Tambahkan baris order_details baru ke cube di memori"""
+    config = _config()
+    df_new = config.load_order_details_since_df(state['last_id'], state['pending_ids'])
+    if df_new.empty:
+        return
+    last_id, pending_ids = config.pending_order_detail_ids(
+        state['last_id'], df_new['order_detail_id'], state['pending_ids'])
+    days = df_new['order_date'].dropna()
+    daily = None
+    if len(days):
+        daily = config.load_order_totals_df('date', start_date=days.min(), end_date=days.max(),
+                                            max_detail_id=last_id)
+    customer_totals = config.load_order_totals_df(
+        'customer', customer_ids=df_new['customer_id'].unique(), max_detail_id=last_id)
+    cubes = rollups.add_new_rows(state['cubes'], df_new, daily, customer_totals)
+    with state['lock']:
+        state['cubes'], state['last_id'], state['pending_ids'] = cubes, last_id, pending_ids
+        state['generation'] += 1
+
+def _handle(state, payloads):
+    changes = set(payloads) - {'orders:INSERT'}
+    if not changes:
+        return
+    if changes == {'order_details:INSERT'}:
+        _apply_new_rows(state)
+    else:
+        _reload(state)
+
+def _listen(state):
+    config = _config()
+    while not state['stop'].is_set():
+        notifications = config.listen_notifications()
+        try:
+            for i, payloads in enumerate(notifications):
+                if state['stop'].is_set():
+                    break
+                if i == 0:
+                    # LISTEN sudah aktif: selama listener belum siap/putus bisa ada
+                    # UPDATE/DELETE yang terlewat, jadi semua total dihitung ulang
+                    _reload(state)
+                _handle(state, payloads)
+        except Exception as e:
+            state['error'] = e
+            print(f"Listener dashboard terputus, menyambung ulang: {e}")
+            time.sleep(RECONNECT_DELAY)
+        finally:
+            notifications.close()
+
+def start():
+    """Muat cube order dari database dan jalankan listener di thread background"""
+    state = {
+        'lock': threading.Lock(),
+        'stop': threading.Event(),
+        'cubes': None,
+        'last_id': 0,
+        'pending_ids': [],  # id <= last_id yang belum terlihat (lihat config.pending_order_detail_ids)
+        'generation': 0,  # naik setiap kali cube diganti
+        'error': None,
+    }
+    _reload(state)
+    threading.Thread(target=_listen, args=(state,), name='dashboard-listener', daemon=True).start()
+    return state
+
+def stop(state):
+    state['stop'].set()
+
+def snapshot(state):
+    """(versi, cube) terbaru, versi berubah setiap kali isi cube berubah"""
+    with state['lock']:
+        return (state['generation'], state['last_id']), state['cubes']
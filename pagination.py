@@ -0,0 +1,113 @@
+"""Pagination tabel detail dashboard
+
+Tabel detail tidak dikirim utuh ke browser, hanya satu halaman:
+
+- Mode file: tabel sudah ada di memori, halaman diambil dengan iloc (offset).
+- Mode DB (tabel order): keyset pagination. Halaman berikutnya diambil dengan
+  WHERE (kolom_sort, id) > (nilai_terakhir, id_terakhir) ... LIMIT n, jadi
+  PostgreSQL langsung melompat ke posisi lewat index, tanpa OFFSET yang makin
+  lambat di halaman belakang. Posisi awal setiap halaman (cursor) disimpan
+  sebagai tumpukan supaya bisa kembali ke halaman sebelumnya.
+
+Widget tabel per halaman (paged_table, keyset_table) dipakai kedua dashboard,
+teksnya mengikuti bahasa dashboard (lihat TEXTS).
+"""
+import pandas as pd
+import streamlit as st
+
+import preprocess
+
+PAGE_SIZES = (25, 50, 100, 250)
+DEFAULT_PAGE_SIZE = 50
+
+def page_count(total_rows, page_size):
+    return max(1, -(-total_rows // page_size))
+
+def page_slice(df, page, page_size):
+    """Baris untuk halaman ke-page (mulai dari 1)"""
+    start = (page - 1) * page_size
+    return df.iloc[start:start + page_size]
+
+def _plain(value):
+    # Nilai numpy/pandas -> tipe Python biasa supaya bisa dikirim sebagai parameter psycopg2
+    if pd.isna(value):
+        return None  # NaT/NaN -> NULL (lihat build_order_details_page_query)
+    if isinstance(value, pd.Timestamp):
+        return value.to_pydatetime()
+    return value.item() if hasattr(value, 'item') else value
+
+def keyset_after(page_df, sort_column, key_column):
+    """Cursor (nilai sort_column, nilai key_column) dari baris terakhir halaman"""
+    last = page_df.iloc[-1]
+    return _plain(last[sort_column]), _plain(last[key_column])
+
+# ============================
+# Widget Streamlit
+# ============================
+
+# Teks widget per bahasa: 'id' untuk dashboard utama, 'en' untuk dashboard Jet
+TEXTS = {
+    'id': {
+        'page_size': "Baris per halaman", 'page': "Halaman",
+        'summary': "{rows:,} baris, {pages} halaman", 'page_number': "Halaman {page}",
+        'prev': "⬅️ Sebelumnya", 'next': "Berikutnya ➡️",
+    },
+    'en': {
+        'page_size': "Rows per page", 'page': "Page",
+        'summary': "{rows:,} rows, {pages} pages", 'page_number': "Page {page}",
+        'prev': "⬅️ Previous", 'next': "Next ➡️",
+    },
+}
+
+def _page_size_select(key, text):
+    return st.selectbox(
+        text['page_size'], PAGE_SIZES, index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key=f"{key}_page_size"
+    )
+
+def paged_table(df, key, lang='id', height='auto'):
+    """Tampilkan satu halaman dari tabel yang sudah difilter & diurutkan"""
+    text = TEXTS[lang]
+    col_size, col_page, col_info = st.columns([1, 1, 2])
+    with col_size:
+        page_size = _page_size_select(key, text)
+    pages = page_count(len(df), page_size)
+    # Jumlah halaman bisa mengecil setelah filter diubah. Nilai halaman hanya
+    # diatur lewat session_state (tanpa value=) supaya Streamlit tidak memberi peringatan.
+    page_key = f"{key}_page"
+    st.session_state[page_key] = min(st.session_state.get(page_key, 1), pages)
+    with col_page:
+        page = st.number_input(text['page'], min_value=1, max_value=pages, step=1, key=page_key)
+    with col_info:
+        st.caption(text['summary'].format(rows=len(df), pages=pages))
+    st.dataframe(page_slice(df, page, page_size), use_container_width=True, height=height)
+
+def keyset_table(filters, sort_column, ascending, columns, key, lang='id', height='auto'):
+    """Mode DB: halaman tabel order diambil langsung dari PostgreSQL (keyset pagination)"""
+    import config  # psycopg2 hanya dibutuhkan di mode DB
+    text = TEXTS[lang]
+    page_size = _page_size_select(key, text)
+    # Cursor halaman direset setiap filter, urutan atau ukuran halaman berubah
+    signature = (tuple(sorted(filters.items())), sort_column, ascending, page_size)
+    if st.session_state.get(f"{key}_keyset_signature") != signature:
+        st.session_state[f"{key}_keyset_signature"] = signature
+        st.session_state[f"{key}_keyset_cursors"] = [None]
+    cursors = st.session_state[f"{key}_keyset_cursors"]
+
+    # Ambil satu baris lebih untuk tahu apakah masih ada halaman berikutnya
+    page = config.load_order_details_page_df(
+        sort_column=sort_column, ascending=ascending, after=cursors[-1], page_size=page_size + 1, **filters
+    )
+    has_next = len(page) > page_size
+    page = preprocess.prepare_order_details(page.iloc[:page_size])
+    st.dataframe(page[columns], use_container_width=True, height=height)
+
+    col_prev, col_info, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        st.button(text['prev'], key=f"{key}_page_prev", disabled=len(cursors) == 1, on_click=cursors.pop)
+    with col_info:
+        st.caption(text['page_number'].format(page=len(cursors)))
+    with col_next:
+        st.button(
+            text['next'], key=f"{key}_page_next", disabled=not has_next, on_click=cursors.append,
+            args=(keyset_after(page, sort_column, 'order_detail_id'),) if has_next else (None,)
+        )
@@ -0,0 +1,170 @@
+"""Preprocessing data dashboard
+
+Konversi tipe dan kolom turunan (usia, kelompok usia, tahun/bulan/hari/jam
+order) dihitung sekali per versi data oleh dashboard, bukan di setiap view
+atau setiap rerun Streamlit. Semua view memakai hasil dari sini.
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+import data_store
+import rollups
+
+DAY_ORDER = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+MONTH_ORDER = ['January', 'February', 'March', 'April', 'May', 'June',
+               'July', 'August', 'September', 'October', 'November', 'December']
+
+AGE_BINS = [0, 20, 30, 40, 50, 60, 100]
+AGE_LABELS = ['<20', '20-30', '30-40', '40-50', '50-60', '60+']
+
+def exact_age(birthdate, today):
+    """Usia dalam tahun penuh (ulang tahun tahun ini sudah lewat atau belum)"""
+    before_birthday = (birthdate.dt.month > today.month) | (
+        (birthdate.dt.month == today.month) & (birthdate.dt.day > today.day))
+    age = today.year - birthdate.dt.year - before_birthday.astype('int64')
+    # Tanggal lahir kosong -> usia kosong (nullable Int16), selain itu int16 biasa.
+    # int16, bukan int8: tanggal lahir salah input (mis. tahun 1890) membuat
+    # usia > 127 yang tidak muat di int8.
+    return age.astype('Int16') if age.isna().any() else age.astype('int16')
+
+def prepare_customers(df, today=None):
+    """Tambahkan kolom Age (int16) dan Age_Group (categorical) ke tabel customers"""
+    today = pd.Timestamp(today or date.today())
+    birthdate = pd.to_datetime(df['birthdate'])
+    age = exact_age(birthdate, today)
+    return df.assign(
+        birthdate=birthdate,
+        Age=age,
+        Age_Group=pd.cut(age, bins=AGE_BINS, labels=AGE_LABELS),
+    )
+
+# ============================
+# Index usia pelanggan
+# ============================
+# Usia hanya puluhan nilai bulat, jadi posisi baris cukup diurutkan sekali per
+# usia (counting sort). Jumlah pelanggan per usia sekaligus menjadi histogram,
+# dan filter rentang usia tinggal mengambil potongan posisi tanpa memindai
+# seluruh tabel.
+
+def build_age_index(df_customers):
+    """Posisi baris (iloc) urut usia, histogram per usia dan per Age_Group"""
+    age = df_customers['Age']
+    valid = age.notna().to_numpy()
+    values = age[valid].to_numpy(dtype='int64')
+    min_age = int(values.min()) if len(values) else 0
+    counts = np.bincount(values - min_age)
+    return {
+        'min_age': min_age,
+        'max_age': min_age + len(counts) - 1,
+        'counts': counts,
+        'offsets': np.concatenate([[0], np.cumsum(counts)]),
+        'positions': np.flatnonzero(valid)[np.argsort(values, kind='stable')],
+        'rows': len(df_customers),
+        'group_counts': df_customers['Age_Group'].value_counts(sort=False),
+    }
+
+def age_histogram(index):
+    """Jumlah pelanggan per usia (hanya usia yang ada pelanggannya)"""
+    ages = np.arange(index['min_age'], index['max_age'] + 1)
+    present = index['counts'] > 0
+    return pd.Series(index['counts'][present], index=pd.Index(ages[present], name='Age'), name='count')
+
+def age_positions(index, low, high):
+    """Posisi baris dengan low <= Age <= high, urut sesuai posisi baris asli"""
+    low = max(int(low), index['min_age'])
+    high = min(int(high), index['max_age'])
+    if low > high:
+        return np.zeros(0, dtype='int64')
+    start = index['offsets'][low - index['min_age']]
+    stop = index['offsets'][high - index['min_age'] + 1]
+    return np.sort(index['positions'][start:stop])
+
+def filter_age(df_customers, index, low, high):
+    """Seperti df_customers[df_customers['Age'].between(low, high)], lewat index usia"""
+    positions = age_positions(index, low, high)
+    if len(positions) == index['rows']:
+        # Objek baru (tanpa salinan data, Copy-on-Write) supaya tabel cache tidak ikut diubah
+        return df_customers.iloc[:]
+    return df_customers.take(positions)
+
+def prepare_products(df):
+    """Pastikan price dan stock bertipe angka"""
+    return df.assign(
+        price=pd.to_numeric(df['price'], errors='coerce'),
+        stock=pd.to_numeric(df['stock'], errors='coerce').fillna(0).astype('int32'),
+    )
+
+def _small_int(values, dtype):
+    """Cast ke int kecil; jika ada nilai kosong (order_date NaT) pakai versi nullable-nya"""
+    return values.astype(dtype.capitalize()) if values.isna().any() else values.astype(dtype)
+
+def prepare_order_details(df):
+    """Konversi tipe kolom order dan tambahkan kolom waktu (year, month, day_name, hour).
+
+    order_date boleh kosong (kolom nullable di database): kolom waktu barisnya
+    ikut kosong (Int16/Int8 nullable, kategori NaN) tanpa membuang barisnya.
+    """
+    order_date = pd.to_datetime(df['order_date'])
+    # Tabel hasil projection (hanya sebagian kolom) cukup dikonversi kolom yang ada
+    numeric = {}
+    if 'quantity' in df.columns:
+        numeric['quantity'] = pd.to_numeric(df['quantity'], errors='coerce').fillna(0).astype('int32')
+    for col in ('subtotal', 'unit_price'):
+        if col in df.columns:
+            numeric[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+    return df.assign(
+        order_date=order_date,
+        **numeric,
+        year=_small_int(order_date.dt.year, 'int16'),
+        month=_small_int(order_date.dt.month, 'int8'),
+        month_name=pd.Categorical(order_date.dt.month_name(), categories=MONTH_ORDER, ordered=True),
+        day_name=pd.Categorical(order_date.dt.day_name(), categories=DAY_ORDER, ordered=True),
+        hour=_small_int(order_date.dt.hour, 'int8'),
+    )
+
+# ============================
+# Loader + preprocessing per tabel
+# ============================
+# Mode file (default) membaca folder data/, mode DB (DASHBOARD_DATA_SOURCE=db)
+# membaca langsung dari PostgreSQL lewat config.py.
+
+TABLES = ('customers', 'products', 'order_details')
+
+def _config():
+    import config  # psycopg2 hanya dibutuhkan di mode DB
+    return config
+
+def data_versions(data_dir=data_store.DATA_DIR):
+    """Versi data setiap tabel: hash isi file (mode file) atau change counter database (mode DB)"""
+    if data_store.DATA_SOURCE == 'db':
+        return _config().table_versions()
+    return {name: data_store.table_version(name, data_dir) for name in TABLES}
+
+def load_customers(data_dir=data_store.DATA_DIR, today=None):
+    if data_store.DATA_SOURCE == 'db':
+        return prepare_customers(_config().load_customers_df(), today)
+    return prepare_customers(data_store.read_customers(data_dir), today)
+
+def load_products(data_dir=data_store.DATA_DIR):
+    if data_store.DATA_SOURCE == 'db':
+        return prepare_products(_config().load_products_df())
+    return prepare_products(data_store.read_products(data_dir))
+
+def load_order_details(data_dir=data_store.DATA_DIR, columns=None, start_date=None, end_date=None):
+    """Tabel order yang sudah di-preprocess, hanya kolom (columns) dan rentang
+    order_date (start_date..end_date, inklusif) yang dibutuhkan view.
+    columns harus memuat order_date."""
+    if data_store.DATA_SOURCE == 'db':
+        df = _config().load_order_details_filtered_df(start_date=start_date, end_date=end_date)
+        return prepare_order_details(df if columns is None else df[list(columns)])
+    return prepare_order_details(data_store.load_order_details(data_dir, columns, start_date, end_date))
+
+def load_rollups(data_dir=data_store.DATA_DIR):
+    """Cube penjualan (lihat rollups.py). Mode DB: dari total per hari, produk
+    dan customer yang dihitung PostgreSQL, baris order tidak dimuat."""
+    if data_store.DATA_SOURCE == 'db':
+        config = _config()
+        return rollups.cubes_from_totals(*(config.load_order_totals_df(group) for group in rollups.TOTALS_GROUPS))
+    return rollups.build_cubes(load_order_details(data_dir, columns=rollups.COLUMNS))
@@ -0,0 +1,38 @@
+"""Index rentang (sorted array) untuk slider filter angka
+
+Nilai satu kolom diurutkan sekali per versi data bersama posisi barisnya.
+Filter low <= nilai <= high cukup dua binary search (searchsorted) lalu
+mengambil potongan posisi di antaranya: O(log n + k) untuk k baris hasil,
+bukan dua mask boolean atas seluruh tabel di setiap geseran slider.
+
+Nilai NaN tidak ikut di index, sama seperti Series.between yang tidak
+pernah meloloskan NaN.
+"""
+import numpy as np
+
+def build(values):
+    """Index rentang untuk values (Series atau array), posisi = iloc baris"""
+    values = np.asarray(values, dtype='float64')
+    valid = np.flatnonzero(~np.isnan(values))
+    order = np.argsort(values[valid], kind='stable')
+    return {'values': values[valid][order], 'positions': valid[order], 'rows': len(values)}
+
+def value_range(index):
+    """(nilai terkecil, nilai terbesar), atau None jika semua nilai kosong"""
+    if len(index['values']) == 0:
+        return None
+    return float(index['values'][0]), float(index['values'][-1])
+
+def range_positions(index, low, high):
+    """Posisi baris dengan low <= nilai <= high, urut sesuai posisi baris asli"""
+    start = np.searchsorted(index['values'], low, side='left')
+    stop = np.searchsorted(index['values'], high, side='right')
+    return np.sort(index['positions'][start:stop])
+
+def filter_range(df, index, low, high):
+    """Seperti df[column.between(low, high)] untuk kolom yang di-index"""
+    positions = range_positions(index, low, high)
+    if len(positions) == index['rows']:
+        # Objek baru (tanpa salinan data, Copy-on-Write) supaya tabel cache tidak ikut diubah
+        return df.iloc[:]
+    return df.take(positions)
@@ -0,0 +1,41 @@
+"""Script untuk refresh materialized view dashboard (lihat Jet/ddd.sql)
+
+Cara pakai:
+    python refresh_views.py                  # refresh sekali (CONCURRENTLY)
+    python refresh_views.py --interval 300   # refresh terus setiap 5 menit
+    python refresh_views.py --blocking       # refresh biasa (mengunci view, untuk view yang belum terisi)
+"""
+from config import *
+import argparse
+import time
+
+def refresh(concurrently=True):
+    start = time.monotonic()
+    refreshed = refresh_materialized_views(concurrently=concurrently)
+    skipped = [view for view in MATERIALIZED_VIEWS if view not in refreshed]
+    print(f"✓ {len(refreshed)} materialized view di-refresh ({time.monotonic() - start:.2f} detik)")
+    if skipped:
+        print(f"  dilewati (sedang di-refresh proses lain): {', '.join(skipped)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh materialized view dashboard")
+    parser.add_argument('--interval', type=float, default=0,
+                        help="refresh berulang setiap N detik (0 = sekali saja)")
+    parser.add_argument('--blocking', action='store_true',
+                        help="refresh tanpa CONCURRENTLY")
+    args = parser.parse_args()
+
+    refresh(concurrently=not args.blocking)
+    if args.interval <= 0:
+        return
+
+    print(f"Refresh setiap {args.interval:g} detik, Ctrl+C untuk berhenti...")
+    stop = start_refresh_scheduler(args.interval, concurrently=not args.blocking)
+    try:
+        while not stop.wait(3600):
+            pass
+    except KeyboardInterrupt:
+        stop.set()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""Rollup (pre-agregasi) penjualan untuk chart dashboard
+
+Tabel order dipadatkan sekali per versi data menjadi dua cube harian:
+
+- sales  : (date, product_id, customer_id) -> quantity, revenue, lines, orders
+- orders : (date, customer_id)             -> quantity, revenue, orders
+
+Chart harian/mingguan/bulanan cukup menjumlahkan baris cube (ribuan baris)
+alih-alih meng-groupby jutaan baris order setiap interaksi.
+
+Catatan jumlah order (distinct order_id): satu order hanya punya satu
+tanggal dan satu customer, jadi kolom orders boleh dijumlahkan lintas hari
+dan customer. Lintas produk tidak boleh (satu order bisa berisi banyak
+produk), karena itu tanpa filter produk dipakai cube orders, dan dengan
+filter produk hasil Orders hanya tepat untuk satu produk.
+
+Selain cube harian ada juga total penjualan per produk sepanjang waktu
+(product_sales) untuk tabel produk. Total ini bisa ditambah baris order
+baru saja (add_product_sales) tanpa menghitung ulang seluruh tabel order.
+Total per customer (customer_totals) dipakai untuk pembeli aktif dan top
+customer.
+
+Di mode DB cube dibangun dari total yang sudah dihitung PostgreSQL
+(cubes_from_totals): cube orders hanya per hari dan tidak ada cube sales,
+filter produk/customer dijalankan di database.
+
+Model datanya star schema: cube dan baris order (tabel fakta) dikelompokkan
+lewat id integer (product_id, customer_id), nama diambil dari tabel dimensi
+cubes['products'] / cubes['customers'] hanya untuk baris hasil akhir
+(misalnya top N), bukan dengan groupby atas string nama.
+"""
+import numpy as np
+import pandas as pd
+
+import topk
+
+FREQUENCIES = ('D', 'W', 'M')
+
+# Kolom tabel order yang dibutuhkan build_cubes (projection saat memuat data)
+COLUMNS = ['order_detail_id', 'order_id', 'order_date', 'customer_id', 'customer_name',
+           'product_id', 'product_name', 'quantity', 'subtotal']
+
+# Total yang dihitung database untuk cubes_from_totals (group config.load_order_totals_df)
+TOTALS_GROUPS = ('date', 'product', 'customer')
+
+# Jumlah produk terlaris yang selalu dijaga urutannya di product_sales['top']
+TOP_PRODUCTS = 50
+
+def build_cubes(df_order_details):
+    """Bangun cube harian dari tabel order yang sudah di-preprocess"""
+    df = df_order_details.assign(date=df_order_details['order_date'].dt.normalize())
+    sales = (
+        df.groupby(['date', 'product_id', 'customer_id'], observed=True, sort=True)
+        .agg(quantity=('quantity', 'sum'), revenue=('subtotal', 'sum'),
+             lines=('order_detail_id', 'size'), orders=('order_id', 'nunique'))
+        .reset_index()
+    )
+    orders = (
+        df.groupby(['date', 'customer_id'], observed=True, sort=True)
+        .agg(quantity=('quantity', 'sum'), revenue=('subtotal', 'sum'), orders=('order_id', 'nunique'))
+        .reset_index()
+    )
+    products = (
+        df[['product_id', 'product_name']].drop_duplicates('product_id')
+        .set_index('product_id')['product_name']
+    )
+    customers = (
+        df[['customer_id', 'customer_name']].drop_duplicates('customer_id')
+        .set_index('customer_id')['customer_name']
+    )
+    return {
+        'sales': sales, 'orders': orders, 'products': products, 'customers': customers,
+        'product_sales': build_product_sales(df_order_details),
+        'customer_totals': _customer_totals(orders),
+    }
+
+def _customer_totals(orders):
+    # Satu order hanya punya satu customer, jadi orders per hari boleh dijumlahkan
+    return orders.groupby('customer_id', sort=True)[['quantity', 'revenue', 'orders']].sum()
+
+def cubes_from_totals(daily, product_totals, customer_totals):
+    """Cube dari total per hari / produk / customer yang dihitung database
+    (config.load_order_totals_df), tanpa memuat baris order.
+
+    Cube orders hanya per hari (tanpa customer_id) dan tidak ada cube sales,
+    jadi roll_up di sini hanya tanpa filter produk/customer.
+    """
+    daily = daily[daily['date'].notna()]
+    return {
+        'orders': daily[['date', 'quantity', 'revenue', 'orders']].reset_index(drop=True),
+        'products': product_totals.set_index('product_id')['product_name'],
+        'customers': customer_totals.set_index('customer_id')['customer_name'],
+        'product_sales': build_product_sales(product_totals.rename(columns={'revenue': 'subtotal'})),
+        'customer_totals': customer_totals.set_index('customer_id')[['quantity', 'revenue', 'orders']],
+    }
+
+def add_new_rows(cubes, df_new, daily, customer_totals):
+    """Cube (dari cubes_from_totals) setelah baris order baru df_new masuk.
+
+    daily dan customer_totals adalah total terbaru dari database hanya untuk
+    rentang hari dan customer yang ada di df_new, jadi jumlah order (distinct
+    order_id) tetap tepat. daily None jika semua baris baru tanpa order_date.
+    product_sales cukup ditambah df_new. Biayanya sebanding dengan baris baru
+    ditambah jumlah hari/customer/produk (salinan array kecil), tidak pernah
+    dengan jumlah baris order.
+    """
+    updated = dict(cubes)
+    orders = cubes['orders']
+    if daily is not None and len(daily):
+        fresh = daily.loc[daily['date'].notna(), ['date', 'quantity', 'revenue', 'orders']]
+        kept = orders[~orders['date'].between(fresh['date'].min(), fresh['date'].max())]
+        updated['orders'] = pd.concat([kept, fresh], ignore_index=True).sort_values('date', ignore_index=True)
+    updated['customer_totals'] = _replace_rows(
+        cubes['customer_totals'], customer_totals.set_index('customer_id')[['quantity', 'revenue', 'orders']])
+    for name, key in (('products', 'product_id'), ('customers', 'customer_id')):
+        names = df_new[[key, cubes[name].name]].drop_duplicates(key).set_index(key)[cubes[name].name]
+        names = names[~names.index.isin(cubes[name].index)]
+        if len(names):
+            updated[name] = pd.concat([cubes[name], names.astype(cubes[name].dtype)])
+    updated['product_sales'] = add_product_sales(cubes['product_sales'], df_new)
+    return updated
+
+def _replace_rows(totals, fresh):
+    # Baris fresh menggantikan baris dengan index sama; id baru ditambahkan (urut index)
+    known = fresh.index.isin(totals.index)
+    updated = totals.copy()
+    updated.loc[fresh.index[known]] = fresh[known].to_numpy()
+    if not known.all():
+        updated = pd.concat([updated, fresh[~known]]).sort_index()
+    return updated
+
+# ============================
+# Total penjualan per produk
+# ============================
+# Disimpan sebagai array yang di-index langsung dengan product_id (id serial,
+# jadi array-nya rapat): quantity[product_id], revenue[product_id]. top berisi
+# TOP_PRODUCTS product_id dengan quantity terbesar, diperbarui bersama total.
+
+def build_product_sales(df_order_details):
+    """Total quantity dan revenue per produk dari seluruh tabel order (atau dari total per produk)"""
+    empty = {'quantity': np.zeros(0, dtype='int64'), 'revenue': np.zeros(0, dtype='float64'),
+             'top': np.zeros(0, dtype='int64')}
+    return add_product_sales(empty, df_order_details)
+
+def add_product_sales(totals, df_new):
+    """Total baru = totals + baris order df_new (hanya baris yang belum pernah dihitung).
+
+    Biayanya sebanding dengan jumlah baris baru ditambah jumlah produk (array
+    disalin supaya snapshot lama yang sedang dibaca sesi lain tidak berubah),
+    bukan dengan jumlah seluruh baris order.
+    """
+    ids = df_new['product_id'].to_numpy()
+    size = max(len(totals['quantity']), int(ids.max()) + 1 if len(ids) else 0)
+    quantity = np.zeros(size, dtype='int64')
+    quantity[:len(totals['quantity'])] = totals['quantity']
+    revenue = np.zeros(size, dtype='float64')
+    revenue[:len(totals['revenue'])] = totals['revenue']
+    added = df_new['quantity'].to_numpy(dtype='int64')
+    np.add.at(quantity, ids, added)
+    np.add.at(revenue, ids, df_new['subtotal'].to_numpy(dtype='float64'))
+    if (added >= 0).all():
+        top = topk.update_top(totals['top'], quantity, np.unique(ids), TOP_PRODUCTS)
+    else:
+        # Ada quantity negatif (koreksi/retur): top lama tidak bisa dipakai lagi
+        top = topk.top_positions(quantity, TOP_PRODUCTS)
+    return {'quantity': quantity, 'revenue': revenue, 'top': top}
+
+def top_products(totals, k):
+    """Top k product_id berdasarkan quantity (Series product_id -> quantity), tanpa produk yang belum terjual"""
+    if k > TOP_PRODUCTS:
+        # Di luar top yang dijaga: pilih dari produk yang pernah terjual saja
+        top = topk.top_series(dense_totals(totals['quantity']), k)
+        return top[top > 0]
+    ids = totals['top'][:k]
+    ids = ids[totals['quantity'][ids] > 0]
+    return pd.Series(totals['quantity'][ids], index=pd.Index(ids, name='product_id'))
+
+def product_sales_for(totals, product_ids):
+    """(quantity, revenue) untuk setiap product_id, 0 untuk produk yang belum pernah terjual"""
+    ids = np.asarray(product_ids)
+    known = ids < len(totals['quantity'])
+    quantity = np.zeros(len(ids), dtype='int64')
+    revenue = np.zeros(len(ids), dtype='float64')
+    quantity[known] = totals['quantity'][ids[known]]
+    revenue[known] = totals['revenue'][ids[known]]
+    return quantity, revenue
+
+# ============================
+# Agregasi per id (star schema)
+# ============================
+
+def totals_by_key(facts, key, value):
+    """Total value per id (Series, index = id yang muncul di facts).
+
+    Seperti facts.groupby(key)[value].sum(), tetapi lewat np.bincount atas id
+    integer (id serial, jadi array-nya rapat) tanpa hashing.
+    """
+    keys = facts[key].to_numpy()
+    if len(keys) == 0:
+        return pd.Series([], index=pd.Index([], name=key, dtype='int64'), name=value, dtype=facts[value].dtype)
+    sums = np.bincount(keys, weights=facts[value].to_numpy(dtype='float64'))
+    ids = np.flatnonzero(np.bincount(keys))
+    sums = sums[ids]
+    if facts[value].dtype.kind in 'iu':
+        sums = sums.round().astype('int64')
+    return pd.Series(sums, index=pd.Index(ids, name=key), name=value)
+
+def dense_totals(values, key='product_id'):
+    """Series dari array total yang di-index dengan id (misalnya product_sales), tanpa id bernilai 0"""
+    ids = np.flatnonzero(values)
+    return pd.Series(values[ids], index=pd.Index(ids, name=key))
+
+def with_names(totals, names):
+    """Ganti index id di totals dengan nama dari tabel dimensi (Series id -> nama).
+
+    Nama yang sama untuk id berbeda diberi akhiran (#id) supaya tetap terpisah
+    di chart.
+    """
+    labels = names.reindex(totals.index).astype('object').to_numpy()
+    duplicated = pd.Series(labels).duplicated(keep=False).to_numpy()
+    if duplicated.any():
+        labels[duplicated] = [f"{label} (#{i})" for label, i in zip(labels[duplicated], totals.index[duplicated])]
+    return pd.Series(totals.to_numpy(), index=pd.Index(labels, name=names.name), name=totals.name)
+
+def period_start(dates, freq='D'):
+    """Awal periode untuk setiap tanggal: hari itu, Senin minggu itu, atau tanggal 1 bulan itu"""
+    if freq == 'D':
+        return dates
+    if freq == 'W':
+        return dates - pd.to_timedelta(dates.dt.weekday, unit='D')
+    if freq == 'M':
+        return dates.dt.to_period('M').dt.start_time
+    raise ValueError(f"freq harus salah satu dari {FREQUENCIES}, bukan {freq!r}")
+
+def _filter(cube, start_date=None, end_date=None, product_ids=None, customer_ids=None):
+    mask = pd.Series(True, index=cube.index)
+    if start_date is not None:
+        mask &= cube['date'] >= pd.Timestamp(start_date)
+    if end_date is not None:
+        mask &= cube['date'] <= pd.Timestamp(end_date)
+    if product_ids is not None:
+        mask &= cube['product_id'].isin(product_ids)
+    if customer_ids is not None:
+        mask &= cube['customer_id'].isin(customer_ids)
+    return cube[mask]
+
+def product_ids_by_name(cubes, names):
+    return cubes['products'].index[cubes['products'].isin(names)]
+
+def customer_ids_by_name(cubes, names):
+    # Nama customer bisa sama untuk beberapa customer_id, semuanya ikut
+    return cubes['customers'].index[cubes['customers'].isin(names)]
+
+def roll_up(cubes, freq='D', start_date=None, end_date=None, product_ids=None, customer_ids=None):
+    """Total Revenue, Quantity dan Orders per periode (kolom Date = awal periode)"""
+    if product_ids is None:
+        base = _filter(cubes['orders'], start_date, end_date, customer_ids=customer_ids)
+    else:
+        base = _filter(cubes['sales'], start_date, end_date, product_ids, customer_ids)
+    return period_totals(base, freq)
+
+def period_totals(daily, freq='D'):
+    """Total Revenue, Quantity dan Orders per periode dari total harian (kolom date, revenue, quantity, orders)"""
+    return (
+        daily.groupby(period_start(daily['date'], freq).rename('Date'), sort=True)
+        .agg(Revenue=('revenue', 'sum'), Quantity=('quantity', 'sum'), Orders=('orders', 'sum'))
+        .reset_index()
+    )
+
+def product_totals(cubes, start_date=None, end_date=None, product_ids=None, customer_ids=None):
+    """Total quantity dan revenue per produk (dengan nama produk) dalam rentang tanggal"""
+    base = _filter(cubes['sales'], start_date, end_date, product_ids, customer_ids)
+    totals = base.groupby('product_id', sort=False).agg(quantity=('quantity', 'sum'), revenue=('revenue', 'sum'))
+    totals.insert(0, 'product_name', cubes['products'].reindex(totals.index).values)
+    return totals.reset_index()
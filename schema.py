@@ -0,0 +1,129 @@
+"""Skema kolom (nama dan tipe data pandas) untuk tabel-tabel dashboard"""
+
+# Harga bertipe NUMERIC(10, 2) di database. pandas tidak punya tipe fixed-point,
+# jadi dibaca sebagai float64 (masih tepat 2 desimal untuk rentang NUMERIC(10, 2))
+# supaya tidak ada objek Decimal per baris yang harus di-to_numeric lagi.
+PRICE_DTYPE = 'float64'
+
+# ============================
+# customers
+# ============================
+CUSTOMER_COLUMNS = ['customer_id', 'name', 'email', 'phone', 'address', 'birthdate']
+CUSTOMER_DTYPES = {
+    'customer_id': 'int32',
+    'name': 'str',
+    'email': 'str',
+    'phone': 'str',       # simpan sebagai teks supaya angka 0 di depan tidak hilang
+    'address': 'str',
+}
+CUSTOMER_DATE_COLUMNS = ['birthdate']
+
+# ============================
+# products
+# ============================
+PRODUCT_COLUMNS = ['product_id', 'name', 'description', 'price', 'stock']
+PRODUCT_DTYPES = {
+    'product_id': 'int32',
+    'name': 'str',
+    'description': 'str',
+    'price': PRICE_DTYPE,
+    'stock': 'int32',
+}
+PRODUCT_DATE_COLUMNS = []
+
+# ============================
+# order_details (gabungan orders, customers, products)
+# ============================
+ORDER_DETAIL_COLUMNS = [
+    'order_detail_id', 'order_id', 'order_date', 'customer_id', 'customer_name',
+    'product_id', 'product_name', 'unit_price', 'quantity', 'subtotal',
+    'order_total', 'phone'
+]
+ORDER_DETAIL_DTYPES = {
+    'order_detail_id': 'int32',
+    'order_id': 'int32',
+    'customer_id': 'int32',
+    'customer_name': 'category',  # nama berulang di setiap baris -> categorical
+    'product_id': 'int32',
+    'product_name': 'category',
+    'unit_price': PRICE_DTYPE,
+    'quantity': 'int32',
+    'subtotal': PRICE_DTYPE,
+    'order_total': PRICE_DTYPE,
+    'phone': 'str',
+}
+ORDER_DETAIL_DATE_COLUMNS = ['order_date']
+
+# Tipe kolom saat file export tabel order (CSV dari COPY, termasuk kolom waktu
+# turunan) dibaca ulang per potongan untuk ditulis sebagai Parquet. Teks
+# memakai 'string' (bukan category) supaya tipe kolom sama di setiap potongan,
+# kolom waktu nullable karena order_date boleh kosong.
+ORDER_DETAIL_EXPORT_DTYPES = {
+    **ORDER_DETAIL_DTYPES,
+    'customer_name': 'string',
+    'product_name': 'string',
+    'phone': 'string',
+    'year': 'Int16',
+    'month': 'Int8',
+    'month_name': 'string',
+    'day_name': 'string',
+    'hour': 'Int8',
+}
+
+# ============================
+# Agregat tabel order (GROUP BY di database, lihat config.build_order_totals_query)
+# ============================
+ORDER_TOTALS_DTYPES = {
+    'product_id': 'int32',
+    'product_name': 'str',
+    'customer_id': 'int32',
+    'customer_name': 'str',
+    'quantity': 'int64',
+    'revenue': PRICE_DTYPE,
+    'orders': 'int64',
+    'lines': 'int64',
+}
+ORDER_TOTALS_DATE_COLUMNS = ['date']
+
+# Total per sel kalender: bulan 1-12, hari 0-6 (mulai Senin), jam 0-23
+ORDER_CALENDAR_COLUMNS = ['month', 'day', 'hour', 'revenue', 'lines']
+ORDER_CALENDAR_DTYPES = {
+    'month': 'int8',
+    'day': 'int8',
+    'hour': 'int8',
+    'revenue': PRICE_DTYPE,
+    'lines': 'int64',
+}
+
+# ============================
+# Materialized view (lihat Jet/ddd.sql)
+# ============================
+DAILY_REVENUE_COLUMNS = ['order_day', 'revenue', 'items', 'orders', 'lines']
+DAILY_REVENUE_DTYPES = {
+    'revenue': PRICE_DTYPE,
+    'items': 'int64',
+    'orders': 'int32',
+    'lines': 'int32',
+}
+DAILY_REVENUE_DATE_COLUMNS = ['order_day']
+
+PRODUCT_SALES_COLUMNS = ['product_id', 'name', 'price', 'stock', 'total_terjual', 'total_pendapatan']
+PRODUCT_SALES_DTYPES = {
+    'product_id': 'int32',
+    'name': 'str',
+    'price': PRICE_DTYPE,
+    'stock': 'int32',
+    'total_terjual': 'int64',
+    'total_pendapatan': PRICE_DTYPE,
+}
+PRODUCT_SALES_DATE_COLUMNS = []
+
+CUSTOMER_SPENDING_COLUMNS = ['customer_id', 'name', 'orders', 'items', 'total_spending', 'last_order_date']
+CUSTOMER_SPENDING_DTYPES = {
+    'customer_id': 'int32',
+    'name': 'str',
+    'orders': 'int32',
+    'items': 'int64',
+    'total_spending': PRICE_DTYPE,
+}
+CUSTOMER_SPENDING_DATE_COLUMNS = ['last_order_date']
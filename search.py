@@ -0,0 +1,63 @@
+"""Pencarian substring nama produk lewat inverted index n-gram
+
+Index dibangun sekali per versi tabel products: setiap nama (huruf kecil)
+dipecah menjadi trigram, dan setiap trigram menyimpan posisi nama yang
+mengandungnya. Untuk teks pencarian, posting list trigram-nya diiris
+(dimulai dari yang terpendek) lalu kandidat dicek ulang dengan substring
+biasa, jadi hasilnya sama persis dengan str.contains(case=False) tetapi
+yang diperiksa hanya segelintir kandidat, bukan semua nama.
+
+Teks yang lebih pendek dari satu trigram tidak bisa diiris, untuk itu
+dipakai scan atas nama unik (tetap jauh lebih kecil dari tabel order).
+Di mode DB pencarian yang sama dijalankan PostgreSQL lewat index pg_trgm
+(lihat Jet/ddd.sql).
+"""
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+NGRAM = 3
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
+def build_index(names, ids):
+    """Bangun index dari nama dan id yang sejajar (misal kolom name dan product_id)"""
+    lowered = pd.Series(names, dtype='str').fillna('').str.lower().to_numpy(dtype=object)
+    postings = defaultdict(list)
+    for pos, name in enumerate(lowered):
+        for gram in _ngrams(name):
+            postings[gram].append(pos)
+    return {
+        'names': lowered,
+        'ids': np.asarray(ids),
+        # posisi naik karena diisi berurutan, jadi bisa diiris dengan assume_unique
+        'postings': {gram: np.array(pos, dtype='int32') for gram, pos in postings.items()},
+    }
+
+def search_positions(index, text):
+    """Posisi (urut naik) nama yang mengandung text, tidak peka huruf besar/kecil"""
+    text = text.lower()
+    names = index['names']
+    if len(text) < NGRAM:
+        return np.flatnonzero([text in name for name in names])
+
+    lists = []
+    for gram in _ngrams(text):
+        found = index['postings'].get(gram)
+        if found is None:
+            return np.empty(0, dtype='int32')
+        lists.append(found)
+    lists.sort(key=len)
+    candidates = lists[0]
+    for other in lists[1:]:
+        if len(candidates) == 0:
+            break
+        candidates = np.intersect1d(candidates, other, assume_unique=True)
+    # Semua trigram ada belum berarti urutannya sama, cek substring di kandidat
+    return candidates[[text in names[pos] for pos in candidates]] if len(candidates) else candidates
+
+def search_ids(index, text):
+    """id (misal product_id) yang namanya mengandung text"""
+    return index['ids'][search_positions(index, text)]
@@ -0,0 +1,51 @@
+"""Cache urutan (argsort) per kolom untuk dropdown "Urutkan berdasarkan"
+
+Untuk setiap tabel dasar (per versi data) urutan baris per kolom dihitung
+sekali saja, saat kolom itu pertama kali dipilih. Setelah itu mengganti
+kolom/arah urutan atau berpindah halaman hanya mengambil baris sesuai
+urutan yang sudah ada (take), tanpa sort_values ulang.
+
+Tabel yang sudah difilter tetap bisa memakai urutan tabel dasar: urutan
+dasar disaring dengan mask baris yang lolos filter, hasilnya sudah urut.
+
+Urutan mengikuti sort_values: NaN selalu di akhir untuk kedua arah, dan
+categorical diurutkan sesuai urutan kategorinya.
+"""
+import threading
+
+import numpy as np
+
+def new_sort_index(df):
+    """Cache urutan kosong untuk tabel df (diisi per kolom saat dibutuhkan)"""
+    return {'frame': df, 'orders': {}, 'lock': threading.Lock()}
+
+def _column_order(index, column):
+    orders = index['orders']
+    if column not in orders:
+        with index['lock']:
+            if column not in orders:
+                values = index['frame'][column].reset_index(drop=True)
+                positions = values.sort_values(kind='stable', na_position='last').index.to_numpy()
+                valid = len(values) - int(values.isna().sum())
+                # (posisi nilai non-NaN urut naik, posisi NaN)
+                orders[column] = (positions[:valid], positions[valid:])
+    return orders[column]
+
+def sorted_positions(index, column, ascending=True, subset=None):
+    """Posisi baris (iloc) tabel dasar dalam urutan column.
+
+    subset: tabel hasil filter dari tabel dasar (index barisnya dipakai), atau
+    None untuk semua baris.
+    """
+    valid, missing = _column_order(index, column)
+    positions = np.concatenate([valid if ascending else valid[::-1], missing])
+    if subset is None:
+        return positions
+    frame = index['frame']
+    mask = np.zeros(len(frame), dtype=bool)
+    mask[frame.index.get_indexer(subset.index)] = True
+    return positions[mask[positions]]
+
+def sort_frame(index, column, ascending=True, subset=None):
+    """Seperti subset.sort_values(column), tetapi memakai urutan yang sudah di-cache"""
+    return index['frame'].take(sorted_positions(index, column, ascending, subset))
@@ -0,0 +1,61 @@
+"""Top N (produk terlaris, customer, hari) tanpa mengurutkan seluruh tabel
+
+np.argpartition memilih k nilai teratas dalam O(n), lalu hanya k nilai itu
+yang diurutkan (O(k log k)), bukan sort_values atas semua baris lalu head.
+
+Untuk total yang hanya bertambah (penjualan append-only), update_top
+memperbarui top k lama cukup dari id yang nilainya berubah: id lain tidak
+mungkin menyalip top k lama, jadi kandidatnya hanya top k lama + id yang
+berubah.
+"""
+import numpy as np
+
+def top_positions(values, k, largest=True):
+    """Posisi k nilai terbesar (atau terkecil), urut dari peringkat pertama. NaN di akhir."""
+    values = np.asarray(values)
+    k = min(int(k), len(values))
+    if k <= 0:
+        return np.zeros(0, dtype='int64')
+    keys = -values.astype('float64') if largest else values.astype('float64')
+    if k < len(values):
+        candidates = np.argpartition(keys, k - 1)[:k]
+    else:
+        candidates = np.arange(len(values))
+    return candidates[np.argsort(keys[candidates], kind='stable')]
+
+def top_series(series, k, largest=True):
+    """Seperti series.sort_values(ascending=not largest).head(k)"""
+    return series.iloc[top_positions(series.to_numpy(), k, largest)]
+
+def top_rows(df, k, columns):
+    """Seperti df.sort_values(columns, ascending=False).head(k).
+
+    Kolom pertama dipilih dengan argpartition. Baris yang seri dengan nilai
+    ke-k ikut jadi kandidat, supaya kolom berikutnya yang menentukan urutan.
+    NaN diurutkan paling akhir di setiap kolom (na_position='last').
+    """
+    columns = [columns] if isinstance(columns, str) else list(columns)
+    primary = df[columns[0]].to_numpy(dtype='float64')
+    positions = top_positions(primary, k)
+    if len(columns) > 1 and len(positions):
+        threshold = primary[positions[-1]]
+        if np.isnan(threshold):
+            # Kurang dari k baris punya nilai: baris NaN ikut terpilih, urutannya
+            # ditentukan kolom berikutnya, jadi semua baris menjadi kandidat
+            candidates = np.arange(len(primary))
+        else:
+            candidates = np.flatnonzero(primary >= threshold)
+        # lexsort: kunci terakhir = kunci utama
+        keys = [-df[col].to_numpy(dtype='float64')[candidates] for col in reversed(columns)]
+        positions = candidates[np.lexsort(keys)][:k]
+    return df.iloc[positions]
+
+def update_top(top_ids, values, changed_ids, k):
+    """Top k id baru setelah values[changed_ids] bertambah.
+
+    top_ids harus top k yang tepat untuk values sebelum berubah, dan nilai
+    tidak boleh turun (jika turun, hitung ulang dengan top_positions).
+    """
+    candidates = np.union1d(top_ids, changed_ids).astype('int64')
+    candidates = candidates[candidates < len(values)]
+    return candidates[top_positions(values[candidates], k)]